@@ -1,8 +1,40 @@
 from django.contrib import admin
 
+from core.admin import AccountNumberSearchMixin
+from core.pagination import EstimatedCountPaginator
+
 from .models import UserAddress, UserBankAccount
 
 # Register your models here.
 
-admin.site.register(UserBankAccount)
+
+@admin.register(UserBankAccount)
+class UserBankAccountAdmin(AccountNumberSearchMixin, admin.ModelAdmin):
+    list_display = [
+        "account_number",
+        "user",
+        "account_type",
+        "balance",
+        "active_loans",
+        "shard_count",
+    ]
+    list_select_related = ["user"]
+    list_filter = ["account_type"]
+    raw_id_fields = ["user"]
+    # Balances and loan counts only move through the posting services, and
+    # shard_count through the set_balance_shards command.
+    readonly_fields = ["balance", "active_loans", "shard_count"]
+    account_number_lookup = "account_number"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        # Writing only the edited fields keeps postings made since the form
+        # was opened.
+        if change:
+            obj.save(update_fields=form.changed_data)
+        else:
+            obj.save()
+
+
 admin.site.register(UserAddress)
@@ -0,0 +1,29 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .snapshots import get_user_snapshot
+
+UserModel = get_user_model()
+
+
+class AccountModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session user together with the bank account
+    and address, so ``request.user.account`` costs no extra query.
+    """
+
+    def get_user(self, user_id):
+        return get_user_snapshot(user_id, self.load_user)
+
+    async def aget_user(self, user_id):
+        return await sync_to_async(self.get_user)(user_id)
+
+    def load_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related("account", "address").get(
+                pk=user_id
+            )
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -1,6 +1,9 @@
+SAVINGS = "Savings"
+CURRENT = "Current"
+
 ACCOUNT_TYPE = (
-    ("Savings", "savings"),
-    ("Current", "current"),
+    (SAVINGS, "savings"),
+    (CURRENT, "current"),
 )
 GENDER_TYPE = (
     ("Male", "male"),
@@ -1,9 +1,11 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.db import transaction
 
 from .constants import ACCOUNT_TYPE, GENDER_TYPE
 from .models import UserAddress, UserBankAccount
+from .onboarding import reserve_account_numbers
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -36,27 +38,32 @@ class UserRegistrationForm(UserCreationForm):
     def save(self, commit=True):
         new_user = super().save(commit=False)
         if commit == True:
-            new_user.save()
-
-            UserBankAccount.objects.create(
-                user=new_user,
-                account_type=self.cleaned_data.get("account_type"),
-                account_number=10000 + new_user.id,
-                date_of_birth=self.cleaned_data.get("date_of_birth"),
-                gender=self.cleaned_data.get("gender"),
-                initial_amount=0,
-            )
-
-            UserAddress.objects.create(
-                user=new_user,
-                postal_code=self.cleaned_data.get("postal_code"),
-                city=self.cleaned_data.get("city"),
-                street_address=self.cleaned_data.get("street_address"),
-                country=self.cleaned_data.get("country"),
-            )
+            (account_number,) = reserve_account_numbers()
+            with transaction.atomic():
+                self._create_user(new_user, account_number)
 
         return new_user
 
+    def _create_user(self, new_user, account_number):
+        new_user.save()
+
+        UserBankAccount.objects.create(
+            user=new_user,
+            account_type=self.cleaned_data.get("account_type"),
+            account_number=account_number,
+            date_of_birth=self.cleaned_data.get("date_of_birth"),
+            gender=self.cleaned_data.get("gender"),
+            initial_amount=0,
+        )
+
+        UserAddress.objects.create(
+            user=new_user,
+            postal_code=self.cleaned_data.get("postal_code"),
+            city=self.cleaned_data.get("city"),
+            street_address=self.cleaned_data.get("street_address"),
+            country=self.cleaned_data.get("country"),
+        )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # print(self)
@@ -0,0 +1,34 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from accounts.onboarding import onboard_accounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with bank accounts and addresses from a CSV file with a "
+        "header row: username, email, first_name, last_name, password, "
+        "account_type, gender, date_of_birth, street_address, city, "
+        "postal_code, country. Passwords should be Django password hashes; "
+        "leave them empty for an unusable password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file of accounts.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--hash-plaintext",
+            action="store_true",
+            help="Hash plaintext passwords instead of rejecting the row (slow).",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="") as f:
+            # Line 1 is the header.
+            rows = enumerate(csv.DictReader(f), start=2)
+            result = onboard_accounts(
+                rows, options["batch_size"], options["hash_plaintext"]
+            )
+        self.stdout.write(json.dumps(result.as_dict(), indent=2))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+from django.db import migrations, models
+from django.db.models import Max
+
+FIRST_ACCOUNT_NUMBER = 10001
+
+
+def seed_sequence(apps, schema_editor):
+    AccountNumberSequence = apps.get_model('accounts', 'AccountNumberSequence')
+    UserBankAccount = apps.get_model('accounts', 'UserBankAccount')
+    highest = UserBankAccount.objects.aggregate(highest=Max('account_number'))['highest']
+    AccountNumberSequence.objects.create(
+        pk=1, next_number=max(FIRST_ACCOUNT_NUMBER, (highest or 0) + 1)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userbankaccount_active_loans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_number', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(seed_sequence, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Sum
 
 from .constants import ACCOUNT_TYPE, GENDER_TYPE
 
@@ -14,10 +15,29 @@ class UserBankAccount(models.Model):
     gender = models.CharField(max_length=10, choices=GENDER_TYPE)
     initial_amount = models.IntegerField(default=0)
     balance = models.DecimalField(default=0, max_digits=12, decimal_places=2)
+    # Loans not yet repaid; kept in step by transactions.services.
+    active_loans = models.PositiveSmallIntegerField(default=0)
+    # Hot accounts take credits on this many BalanceShard rows instead of
+    # this one; 0 means every posting updates ``balance`` directly.
+    shard_count = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return f"{self.account_number}"
 
+    @property
+    def current_balance(self):
+        """The balance including credits not yet compacted off the shards."""
+        if not self.shard_count:
+            return self.balance
+        shards = self.balance_shards.aggregate(total=Sum("amount"))["total"]
+        return self.balance + (shards or 0)
+
+    async def acurrent_balance(self):
+        if not self.shard_count:
+            return self.balance
+        shards = (await self.balance_shards.aaggregate(total=Sum("amount")))["total"]
+        return self.balance + (shards or 0)
+
 
 class UserAddress(models.Model):
     user = models.OneToOneField(User, related_name="address", on_delete=models.CASCADE)
@@ -28,3 +48,35 @@ class UserAddress(models.Model):
 
     def __str__(self) -> str:
         return str(self.user.email)
+
+
+class AccountNumberSequence(models.Model):
+    """The next free account number; see accounts.onboarding."""
+
+    next_number = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Next account number: {self.next_number}"
+
+
+class BalanceShard(models.Model):
+    """Part of a hot account's balance; see transactions.services."""
+
+    account = models.ForeignKey(
+        UserBankAccount,
+        related_name="balance_shards",
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    slot = models.PositiveSmallIntegerField()
+    amount = models.DecimalField(default=0, max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "slot"], name="balance_shard_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account} shard {self.slot}: {self.amount}"
@@ -0,0 +1,17 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UserAddress, UserBankAccount
+from .snapshots import invalidate_account_snapshots
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    invalidate_account_snapshots([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=UserBankAccount)
+@receiver([post_save, post_delete], sender=UserAddress)
+def invalidate_owner_snapshot(sender, instance, **kwargs):
+    invalidate_account_snapshots([instance.user_id])
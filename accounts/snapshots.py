@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def snapshot_timeout():
+    return getattr(settings, "ACCOUNT_SNAPSHOT_TIMEOUT", 0)
+
+
+def versions_enabled():
+    # Report pages are cached under the same version; see TransactionReportView.
+    return bool(snapshot_timeout() or getattr(settings, "REPORT_CACHE_TIMEOUT", 0))
+
+
+def _version_key(user_id):
+    return f"account-snapshot-version:{user_id}"
+
+
+def _snapshot_key(user_id, version):
+    return f"account-snapshot:{user_id}:{version}"
+
+
+def get_user_snapshot(user_id, load_user):
+    """
+    Return the user (with account and address) for ``user_id``.
+
+    When ACCOUNT_SNAPSHOT_TIMEOUT is set the loaded user is cached under the
+    user's current version, which every posting bumps. The version is read
+    before the database so a load racing a posting is stored under the old
+    version and never served.
+    """
+    timeout = snapshot_timeout()
+    if not timeout:
+        return load_user(user_id)
+
+    key = _snapshot_key(user_id, account_version(user_id))
+    user = cache.get(key)
+    if user is None:
+        user = load_user(user_id)
+        if user is not None:
+            cache.set(key, user, timeout)
+    return user
+
+
+def account_version(user_id):
+    """The version of ``user_id``'s account; read it before the database."""
+    cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+    return cache.get(_version_key(user_id))
+
+
+async def aaccount_version(user_id):
+    await cache.aadd(_version_key(user_id), time.time_ns(), timeout=None)
+    return await cache.aget(_version_key(user_id))
+
+
+def invalidate_account_snapshots(user_ids):
+    """Bump the snapshot version of each user once the transaction commits."""
+    if not versions_enabled():
+        return
+    user_ids = set(user_ids)
+
+    def bump():
+        for user_id in user_ids:
+            try:
+                cache.incr(_version_key(user_id))
+            except ValueError:
+                cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
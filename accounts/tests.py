@@ -1,3 +1,234 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from transactions.services import post_deposit
+
+from .forms import UserRegistrationForm
+from .models import AccountNumberSequence, UserAddress, UserBankAccount
+from .onboarding import onboard_accounts, reserve_account_numbers
+
+
+class AccountSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="customer", password="pass", first_name="Test"
+        )
+        self.account = UserBankAccount.objects.create(
+            user=self.user, account_type="Savings", account_number=10001, balance=100
+        )
+        UserAddress.objects.create(
+            user=self.user,
+            street_address="1 Road",
+            city="Town",
+            postal_code=1000,
+            country="Bangladesh",
+        )
+        self.client.login(username="customer", password="pass")
+
+    def test_navbar_loads_account_with_user(self):
+        # Session and user (joined with account and address).
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("home"))
+
+        self.assertContains(response, "balance : 100")
+
+    def test_sessions_from_the_default_backend_still_load(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+
+        response = self.client.get(reverse("home"))
+
+        self.assertContains(response, "balance : 100")
+
+    @override_settings(ACCOUNT_SNAPSHOT_TIMEOUT=60)
+    def test_snapshot_skips_user_query_until_posting(self):
+        self.client.get(reverse("home"))
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse("home"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post_deposit(self.account, Decimal("50"))
+
+        response = self.client.get(reverse("home"))
+        self.assertContains(response, "balance : 150")
+
+    @override_settings(ACCOUNT_SNAPSHOT_TIMEOUT=60)
+    def test_profile_changes_invalidate_snapshot(self):
+        self.client.get(reverse("home"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).save()
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse("home"))
+
+
+class UserBankAccountAdminTests(TestCase):
+    def test_search_by_account_number(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        for number in (1001, 10010):
+            user = User.objects.create_user(username=f"user{number}")
+            UserBankAccount.objects.create(
+                user=user, account_type="Savings", account_number=number, gender="Male"
+            )
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse("admin:accounts_userbankaccount_changelist"), {"q": "1001"}
+        )
+
+        self.assertEqual(
+            [account.account_number for account in response.context["cl"].result_list],
+            [1001],
+        )
+
+    def test_saving_an_account_keeps_its_balance(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        user = User.objects.create_user(username="customer")
+        account = UserBankAccount.objects.create(
+            user=user,
+            account_type="Savings",
+            account_number=1001,
+            gender="Male",
+            balance=100,
+        )
+        self.client.force_login(admin)
+        url = reverse("admin:accounts_userbankaccount_change", args=[account.pk])
+        form = self.client.get(url).context["adminform"].form
+        post_deposit(account, Decimal("50"))
+
+        data = {**form.initial, "user": user.pk, "gender": "Female"}
+        data = {key: value for key, value in data.items() if value is not None}
+        response = self.client.post(url, data)
+
+        self.assertEqual(response.status_code, 302)
+        account.refresh_from_db()
+        self.assertEqual(account.gender, "Female")
+        self.assertEqual(account.balance, Decimal("150"))
+        self.assertNotIn("balance", form.fields)
+        self.assertNotIn("active_loans", form.fields)
+
+
+def onboarding_row(username, **fields):
+    return {
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "",
+        "account_type": "Savings",
+        "gender": "Female",
+        "date_of_birth": "1990-05-01",
+        "street_address": "1 Road",
+        "city": "Town",
+        "postal_code": "1000",
+        "country": "Bangladesh",
+        **fields,
+    }
+
+
+class OnboardingTests(TestCase):
+    def test_blocks_do_not_overlap(self):
+        first = reserve_account_numbers(3)
+        second = reserve_account_numbers(2)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(second.start, first.stop)
+
+    def test_sequence_row_is_recreated_past_existing_numbers(self):
+        AccountNumberSequence.objects.all().delete()
+        user = User.objects.create_user(username="old")
+        UserBankAccount.objects.create(
+            user=user, account_type="Savings", account_number=50000, gender="Male"
+        )
+
+        self.assertEqual(list(reserve_account_numbers(2)), [50001, 50002])
+
+    def test_registration_takes_a_number_from_the_sequence(self):
+        (expected,) = reserve_account_numbers()
+        form = UserRegistrationForm(
+            {
+                "first_name": "New",
+                "last_name": "Customer",
+                "username": "newcustomer",
+                "email": "new@example.com",
+                "password1": "a-Long-passw0rd",
+                "password2": "a-Long-passw0rd",
+                **onboarding_row("newcustomer"),
+            }
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+        user = form.save()
+
+        self.assertEqual(user.account.account_number, expected + 1)
+        self.assertEqual(user.address.city, "Town")
+
+    def test_onboards_rows_in_bulk(self):
+        password = make_password("secret")
+        User.objects.create_user(username="taken")
+        rows = [
+            onboarding_row("alice", password=password),
+            onboarding_row("bob"),
+            onboarding_row("taken"),
+            onboarding_row("carol", password="plain"),
+            onboarding_row("dave", account_type="Gold"),
+        ]
+
+        result = onboard_accounts(enumerate(rows, start=2), batch_size=2)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            [(failure["line"], failure["reason"]) for failure in result.failures],
+            [
+                (4, "Username already exists"),
+                (5, "Password is not a recognised hash"),
+                (6, "Invalid account type"),
+            ],
+        )
+        alice = User.objects.select_related("account", "address").get(username="alice")
+        self.assertTrue(alice.check_password("secret"))
+        self.assertEqual(alice.address.postal_code, 1000)
+        self.assertFalse(User.objects.get(username="bob").has_usable_password())
+        numbers = sorted(
+            UserBankAccount.objects.values_list("account_number", flat=True)
+        )
+        self.assertEqual(len(set(numbers)), 2)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def onboard(count, prefix):
+            rows = [onboarding_row(f"{prefix}{i}") for i in range(count)]
+            with CaptureQueriesContext(connection) as captured:
+                onboard_accounts(enumerate(rows), batch_size=count)
+            return len(captured)
+
+        self.assertEqual(onboard(50, "many"), onboard(2, "few"))
+
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            writer = csv.DictWriter(f, fieldnames=onboarding_row("x").keys())
+            writer.writeheader()
+            writer.writerow(onboarding_row("erin"))
+            writer.writerow(onboarding_row("frank", password="plain"))
+        self.addCleanup(os.unlink, f.name)
+
+        out = StringIO()
+        call_command("onboard_accounts", f.name, "--hash-plaintext", stdout=out)
+
+        self.assertEqual(json.loads(out.getvalue())["created"], 2)
+        self.assertTrue(User.objects.get(username="frank").check_password("plain"))
+        self.assertTrue(UserBankAccount.objects.filter(user__username="erin").exists())
@@ -0,0 +1,13 @@
+"""
+Settings for running the test suite:
+
+    python manage.py test --settings=bank_management_project.settings_test
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # An in-memory test database locks instead of waiting when several
+    # threads write at once; the concurrency tests need a real file.
+    DATABASES["default"]["TEST"] = {"NAME": BASE_DIR / "test_db.sqlite3"}
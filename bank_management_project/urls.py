@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.urls import include, path
 
-from core.views import HomeView
+from core.views import HealthCheckView, HomeView, ProfilingStatsView
 
 urlpatterns = [
     path("", HomeView.as_view(), name="home"),
+    path("health/", HealthCheckView.as_view(), name="health"),
+    path("profiling/", ProfilingStatsView.as_view(), name="profiling_stats"),
     path("admin/", admin.site.urls),
     path("accounts/", include("accounts.urls")),
     path("transactions/", include("transactions.urls")),
@@ -1,3 +1,36 @@
 from django.contrib import admin
 
+from .models import OutboxEmail
+
 # Register your models here.
+
+
+class AccountNumberSearchMixin:
+    """
+    Search a changelist by exact account number.
+
+    Django's own search casts integer fields to text, which skips the unique
+    index on account_number; this filters on the number itself.
+    """
+
+    account_number_lookup = "account__account_number"
+    search_help_text = "Exact account number"
+
+    def get_search_fields(self, request):
+        return [self.account_number_lookup]
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if not search_term.isdigit():
+            return queryset.none(), False
+        lookup = {self.account_number_lookup: int(search_term)}
+        return queryset.filter(**lookup), False
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ["subject", "to", "created_at", "attempts", "sent_at"]
+    list_filter = ["sent_at"]
+    search_fields = ["to"]
@@ -0,0 +1,92 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def fetch(host, port, path, headers):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+    request += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    writer.write(f"{request}\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    # An empty or malformed reply counts as an error, not a crash.
+    parts = status_line.split()
+    if len(parts) < 2 or not parts[1].isdigit():
+        return None
+    return int(parts[1])
+
+
+async def run_load(url, requests, concurrency, headers):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+    pending = iter(range(requests))
+    timings, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            started = time.perf_counter()
+            try:
+                status = await fetch(parts.hostname, parts.port or 80, path, headers)
+            except OSError:
+                status = None
+            timings.append((time.perf_counter() - started) * 1000)
+            if status is None or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "errors": errors,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests/sec and latency of running servers, e.g. the WSGI app "
+        "under gunicorn against the ASGI app under uvicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls", nargs="+", help="Full URLs to load, one per server under test."
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument(
+            "--session",
+            help="sessionid cookie to send, for pages that require a login.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2")
+        headers = {}
+        if options["session"]:
+            headers["Cookie"] = f"sessionid={options['session']}"
+
+        self.stdout.write(
+            f"{'url':<50}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+        )
+        for url in options["urls"]:
+            result = asyncio.run(
+                run_load(url, options["requests"], options["concurrency"], headers)
+            )
+            self.stdout.write(
+                f"{url:<50}{result['requests_per_second']:>10.1f}"
+                f"{result['p50']:>10.1f}{result['p95']:>10.1f}{result['errors']:>8}"
+            )
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .profiling import track
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 30
+# How long a claimed batch is kept from other dispatchers while it is sent.
+LEASE_SECONDS = 300
+
+
+def enqueue_email(subject, to, html_body):
+    """
+    Queue an email for the dispatch worker.
+
+    The row is written through the current connection, so calling this inside
+    ``transaction.atomic()`` ties the email to the rest of the transaction.
+    """
+    with track("email"):
+        return OutboxEmail.objects.create(subject=subject, to=to, html_body=html_body)
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, "", to=[email.to], connection=connection
+    )
+    message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def _defer(email, error):
+    email.last_error = str(error) or error.__class__.__name__
+    email.next_attempt_at = timezone.now() + timedelta(
+        seconds=RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1)
+    )
+
+
+def dispatch_outbox(batch_size=100, connection=None):
+    """
+    Send one batch of due emails over a single connection.
+
+    The batch is claimed in a short transaction that counts the attempt and
+    leases the emails for LEASE_SECONDS, so other dispatchers skip them. They
+    are sent outside any transaction, and the outcome is written back in a
+    second one; a dispatcher that dies mid-batch leaves its emails to be
+    retried when the lease runs out. Failed emails, including a batch whose
+    connection would not open, are retried with exponential backoff until
+    MAX_ATTEMPTS. Returns ``(sent, failed)``.
+    """
+    connection = connection or get_connection()
+    now = timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                sent_at__isnull=True,
+                next_attempt_at__lte=now,
+                attempts__lt=MAX_ATTEMPTS,
+            )
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + timedelta(seconds=LEASE_SECONDS)
+        OutboxEmail.objects.bulk_update(batch, ["attempts", "next_attempt_at"])
+
+    try:
+        connection.open()
+    except Exception as e:
+        # Nothing went out; record why, or the claimed attempt is lost.
+        for email in batch:
+            _defer(email, e)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                try:
+                    _build_message(email, connection).send()
+                except Exception as e:
+                    _defer(email, e)
+                    failed += 1
+                else:
+                    email.sent_at = timezone.now()
+                    email.last_error = ""
+                    sent += 1
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_update(
+            batch, ["sent_at", "next_attempt_at", "last_error"]
+        )
+
+    return sent, failed
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("sql", "template", "email")
+
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.times = dict.fromkeys(SECTIONS, 0.0)
+
+    def add(self, section, seconds):
+        self.times[section] += seconds
+
+
+@contextmanager
+def track(section):
+    """Add the time spent in the block to the current request's ``section``."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(section, time.perf_counter() - started)
+
+
+class ProfileStats:
+    """Per-URL aggregates for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, wall, profile):
+        with self._lock:
+            stats = self._stats.setdefault(
+                name,
+                {"requests": 0, "wall": 0.0, "max_wall": 0.0, "sql_count": 0}
+                | {section: 0.0 for section in SECTIONS},
+            )
+            stats["requests"] += 1
+            stats["wall"] += wall
+            stats["max_wall"] = max(stats["max_wall"], wall)
+            stats["sql_count"] += profile.sql_count
+            for section, seconds in profile.times.items():
+                stats[section] += seconds
+
+    def snapshot(self):
+        """Return ``{url_name: averages}``, slowest total time first."""
+        with self._lock:
+            items = [(name, dict(stats)) for name, stats in self._stats.items()]
+        result = {}
+        for name, stats in sorted(items, key=lambda item: -item[1]["wall"]):
+            requests = stats["requests"]
+            result[name] = {
+                "requests": requests,
+                "total_ms": round(stats["wall"] * 1000, 1),
+                "avg_ms": round(stats["wall"] * 1000 / requests, 2),
+                "max_ms": round(stats["max_wall"] * 1000, 2),
+                "avg_sql_count": round(stats["sql_count"] / requests, 2),
+            } | {
+                f"avg_{section}_ms": round(stats[section] * 1000 / requests, 2)
+                for section in SECTIONS
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+stats = ProfileStats()
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_count += 1
+        profile.add("sql", time.perf_counter() - started)
+
+
+def _install_sql_wrapper(connection, **kwargs):
+    # Installed on every connection rather than per request, so ORM calls that
+    # async views run in worker threads are counted too.
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+_render_template = Template.render
+
+
+def _timed_render(self, *args, **kwargs):
+    with track("template"):
+        return _render_template(self, *args, **kwargs)
+
+
+_installed = False
+
+
+def install():
+    """
+    Hook SQL and template timing into Django.
+
+    Connections are per thread: ones opened later are hooked through
+    ``connection_created``, ones already open only in the calling thread.
+    CoreConfig.ready() calls this at startup, before any are opened.
+    """
+    global _installed
+    for connection in connections.all(initialized_only=True):
+        _install_sql_wrapper(connection)
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_install_sql_wrapper)
+    Template.render = _timed_render
+
+
+class ProfilingMiddleware:
+    """
+    Time each request's SQL, template rendering and email queueing.
+
+    Enabled by REQUEST_PROFILING; otherwise Django drops the middleware at
+    startup and nothing is hooked. Each request is logged as one key=value
+    line on the ``core.profiling`` logger and folded into per-URL aggregates
+    served by ProfilingStatsView. Sections can overlap: SQL run while queueing
+    an email counts toward both.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, profile)
+        return response
+
+    def finish(self, request, response, profile):
+        wall = time.perf_counter() - profile.started
+        match = request.resolver_match
+        name = match.view_name if match else "<unresolved>"
+        stats.record(name, wall, profile)
+        fields = {
+            "url_name": name,
+            "method": request.method,
+            "status": response.status_code,
+            "wall_ms": round(wall * 1000, 2),
+            "sql_count": profile.sql_count,
+        } | {
+            f"{section}_ms": round(seconds * 1000, 2)
+            for section, seconds in profile.times.items()
+        }
+        logger.info(
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra={"profile": fields},
+        )
@@ -1,3 +1,208 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserBankAccount
+
+from .models import OutboxEmail
+from .outbox import MAX_ATTEMPTS, dispatch_outbox, enqueue_email
+from .pagination import EstimatedCountPaginator
+from .profiling import ProfilingMiddleware, install, stats
+
+
+class FailingConnection:
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise OSError("SMTP unavailable")
+
+
+class UnreachableConnection(FailingConnection):
+    def open(self):
+        raise ConnectionRefusedError("Connection refused")
+
+
+class LeaseCheckingConnection(FailingConnection):
+    """Records the transaction depth and the claimed rows while sending."""
+
+    def __init__(self):
+        self.seen = []
+
+    def send_messages(self, messages):
+        self.seen.append(
+            (
+                len(connection.savepoint_ids),
+                list(OutboxEmail.objects.values_list("attempts", "next_attempt_at")),
+            )
+        )
+        return len(messages)
+
+
+class OutboxTests(TestCase):
+    def test_dispatch_sends_pending_emails_once(self):
+        enqueue_email("Hello", "a@example.com", "<p>one</p>")
+        enqueue_email("Hello", "b@example.com", "<p>two</p>")
+
+        self.assertEqual(dispatch_outbox(), (2, 0))
+        self.assertEqual(dispatch_outbox(), (0, 0))
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], "<p>one</p>")
+        self.assertFalse(OutboxEmail.objects.filter(sent_at__isnull=True).exists())
+
+    def test_failed_email_is_retried_with_backoff(self):
+        email = enqueue_email("Hello", "a@example.com", "<p>one</p>")
+
+        self.assertEqual(dispatch_outbox(connection=FailingConnection()), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(dispatch_outbox(), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatch_outbox(), (1, 0))
+
+    def test_connection_that_fails_to_open_records_the_error(self):
+        email = enqueue_email("Hello", "a@example.com", "<p>one</p>")
+
+        self.assertEqual(dispatch_outbox(connection=UnreachableConnection()), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, "Connection refused")
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIsNone(email.sent_at)
+
+    def test_sends_outside_the_claiming_transaction(self):
+        enqueue_email("Hello", "a@example.com", "<p>one</p>")
+        smtp = LeaseCheckingConnection()
+        depth = len(connection.savepoint_ids)
+
+        self.assertEqual(dispatch_outbox(connection=smtp), (1, 0))
+
+        ((send_depth, [(attempts, leased_until)]),) = smtp.seen
+        self.assertEqual(send_depth, depth)
+        self.assertEqual(attempts, 1)
+        self.assertGreater(leased_until, timezone.now())
+        self.assertIsNotNone(OutboxEmail.objects.get().sent_at)
+
+    def test_gives_up_after_max_attempts(self):
+        enqueue_email("Hello", "a@example.com", "<p>one</p>")
+        OutboxEmail.objects.update(attempts=MAX_ATTEMPTS)
+
+        self.assertEqual(dispatch_outbox(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_command_drains_outbox(self):
+        for i in range(5):
+            enqueue_email("Hello", f"{i}@example.com", "<p>hi</p>")
+
+        out = StringIO()
+        call_command("send_outbox_emails", batch_size=2, stdout=out)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ["Sent 2 email(s), 0 failed"] * 2 + ["Sent 1 email(s), 0 failed"],
+        )
+
+
+class HealthCheckViewTests(TestCase):
+    def test_reports_database_status(self):
+        response = self.client.get(reverse("health"))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["status"], "ok")
+        self.assertEqual(data["database"]["vendor"], "sqlite")
+        self.assertNotIn("pool", data["database"])
+
+
+class TemplateLoaderTests(TestCase):
+    def test_templates_are_compiled_once(self):
+        engine = engines["django"].engine
+        (loader,) = engine.template_loaders
+
+        self.assertIsInstance(loader, CachedLoader)
+        self.assertIs(
+            engine.get_template("navbar.html"), engine.get_template("navbar.html")
+        )
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def test_counts_exactly_without_planner_statistics(self):
+        for i in range(3):
+            enqueue_email("Hello", f"{i}@example.com", "<p>hi</p>")
+
+        paginator = EstimatedCountPaginator(OutboxEmail.objects.order_by("pk"), 2)
+
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        # As CoreConfig.ready() does when the process starts with profiling on.
+        install()
+        stats.reset()
+        self.user = User.objects.create_user(
+            username="customer", password="pass", email="customer@example.com"
+        )
+        UserBankAccount.objects.create(
+            user=self.user, account_type="Savings", account_number=10001
+        )
+
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_profiles_request_by_url_name(self):
+        client = Client()
+        client.force_login(self.user)
+
+        with self.assertLogs("core.profiling", "INFO") as logs:
+            client.post(reverse("deposit"), {"amount": "500", "transaction_type": 1})
+
+        (line,) = logs.output
+        self.assertIn("url_name=deposit method=POST status=302", line)
+        profile = logs.records[0].profile
+        self.assertGreater(profile["sql_count"], 0)
+        self.assertGreater(profile["email_ms"], 0)
+        self.assertGreater(profile["template_ms"], 0)
+        self.assertEqual(stats.snapshot()["deposit"]["requests"], 1)
+
+    @override_settings(REQUEST_PROFILING=True)
+    async def test_counts_queries_of_async_views(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+
+        with self.assertLogs("core.profiling", "INFO") as logs:
+            await client.get(reverse("all_loans"))
+
+        self.assertGreater(logs.records[0].profile["sql_count"], 0)
+
+    def test_stats_endpoint_is_staff_only(self):
+        url = reverse("profiling_stats")
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+
+        self.assertEqual(response.json(), {"enabled": False, "views": {}})
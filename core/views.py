@@ -1,8 +1,65 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db import DatabaseError, connection
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views import View
 from django.views.generic import TemplateView
 
+from .profiling import stats
+
 # Create your views here.
 
 
 class HomeView(TemplateView):
     template_name = "index.html"
+
+    async def get(self, request, *args, **kwargs):
+        # The response is rendered off the event loop by Django, where the
+        # navbar may still lazily load request.user.
+        return self.render_to_response(self.get_context_data(**kwargs))
+
+
+class HealthCheckView(View):
+    """Report database reachability and connection reuse for load balancers."""
+
+    def get(self, request, *args, **kwargs):
+        started = perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            return JsonResponse({"status": "unavailable"}, status=503)
+
+        database = {
+            "vendor": connection.vendor,
+            "latency_ms": round((perf_counter() - started) * 1000, 2),
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+        }
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            database["pool"] = pool.get_stats()
+        return JsonResponse({"status": "ok", "database": database})
+
+
+class ProfilingStatsView(UserPassesTestMixin, View):
+    """Per-URL request profile averages for this process; POST resets them."""
+
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(
+            {
+                "enabled": getattr(settings, "REQUEST_PROFILING", False),
+                "views": stats.snapshot(),
+            }
+        )
+
+    def post(self, request, *args, **kwargs):
+        stats.reset()
+        return JsonResponse({"reset": True})
@@ -1,20 +1,103 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 
-from .models import TransactionModel
+from core.admin import AccountNumberSearchMixin
+from core.pagination import EstimatedCountPaginator
+
+from .constants import DEBIT_TYPES
+from .models import ConsumerOffset, Loan, TransactionModel
+from .services import approve_loans, post_entry
+
+
+class TransactionAdminForm(forms.ModelForm):
+    def clean(self):
+        cleaned_data = super().clean()
+        account = cleaned_data.get("account")
+        amount = cleaned_data.get("amount")
+        if amount is None:
+            return cleaned_data
+        if amount <= 0:
+            self.add_error("amount", "Amount must be greater than zero.")
+        elif (
+            account
+            and cleaned_data.get("transaction_type") in DEBIT_TYPES
+            and account.current_balance < amount
+        ):
+            # A hint only; the posting's guarded update has the final say.
+            self.add_error("amount", "Insufficient Balance")
+        return cleaned_data
 
 
 @admin.register(TransactionModel)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(AccountNumberSearchMixin, admin.ModelAdmin):
+    form = TransactionAdminForm
     list_display = [
         "account",
         "amount",
         "balance_after_transaction",
         "transaction_type",
-        "loan_approve",
+        "timeStamp",
     ]
+    list_select_related = ["account"]
+    raw_id_fields = ["account"]
+    date_hierarchy = "timeStamp"
+    ordering = ["-timeStamp", "-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_readonly_fields(self, request, obj=None):
+        # Posted entries are history; correct them with a new entry.
+        if obj is not None:
+            return [
+                "account",
+                "transaction_type",
+                "amount",
+                "balance_after_transaction",
+                "timeStamp",
+            ]
+        return []
+
+    def get_exclude(self, request, obj=None):
+        # Computed when the entry is posted.
+        if obj is None:
+            return ["balance_after_transaction"]
+        return None
 
     def save_model(self, request, obj, form, change):
-        obj.account.balance += obj.amount
-        obj.balance_after_transaction = obj.account.balance
-        obj.account.save()
-        super().save_model(request, obj, form, change)
+        if not change:
+            post_entry(obj)
+
+
+@admin.register(Loan)
+class LoanAdmin(AccountNumberSearchMixin, admin.ModelAdmin):
+    list_display = ["id", "account", "amount", "status", "requested_at", "approved_at"]
+    list_filter = ["status"]
+    list_select_related = ["account"]
+    readonly_fields = [
+        "account",
+        "amount",
+        "status",
+        "requested_at",
+        "approved_at",
+        "paid_at",
+        "disbursement",
+        "repayment",
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["approve_selected"]
+
+    def has_add_permission(self, request):
+        # Loans are requested by customers, which claims a loan slot.
+        return False
+
+    @admin.action(description="Approve selected loans")
+    def approve_selected(self, request, queryset):
+        approved = approve_loans(queryset)
+        self.message_user(request, f"Approved {len(approved)} loans.", messages.SUCCESS)
+
+
+@admin.register(ConsumerOffset)
+class ConsumerOffsetAdmin(admin.ModelAdmin):
+    # Lowering a group's position replays the events after it.
+    list_display = ["group", "position", "updated_at"]
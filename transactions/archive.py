@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import ArchivedTransaction, Loan, TransactionModel
+
+FIELDS = [
+    "id",
+    "account_id",
+    "transaction_type",
+    "amount",
+    "balance_after_transaction",
+    "timeStamp",
+]
+
+
+def archive_horizon():
+    """Ledger rows stamped before this may have moved to the archive."""
+    return timezone.now() - timedelta(days=settings.TRANSACTION_ARCHIVE_AFTER_DAYS)
+
+
+def ledger_parts(start=None, end=None, **filters):
+    """
+    Return the querysets holding the ledger rows stamped in ``[start, end)``.
+
+    That is the hot table, plus the archive only when ``start`` reaches back
+    past the archive horizon. Both select the same columns, so callers can
+    aggregate them one by one or read them as one with combine().
+    """
+    parts = [TransactionModel.objects.filter(**filters)]
+    if start is None or start < archive_horizon():
+        parts.append(ArchivedTransaction.objects.filter(**filters))
+    if start is not None:
+        parts = [part.filter(timeStamp__gte=start) for part in parts]
+    if end is not None:
+        parts = [part.filter(timeStamp__lt=end) for part in parts]
+    return parts
+
+
+def combine(parts):
+    """UNION ALL the ledger parts; the result can only be ordered and sliced."""
+    if len(parts) == 1:
+        return parts[0]
+    first, *rest = (part.order_by() for part in parts)
+    return first.union(*rest, all=True)
+
+
+def archive_transactions(before=None, batch_size=1000):
+    """
+    Move ledger rows stamped before ``before`` into the archive table.
+
+    ``before`` is capped at the archive horizon, since readers only look in
+    the archive for ranges that start before it. Rows move oldest first, one
+    batch per short transaction, so it can run next to postings and be
+    stopped at any point. Rows a loan points at stay in the hot table.
+    Returns the number of rows moved.
+    """
+    horizon = archive_horizon()
+    before = min(before, horizon) if before else horizon
+    loan_entries = Loan.objects.filter(
+        Q(disbursement=OuterRef("pk")) | Q(repayment=OuterRef("pk"))
+    )
+    candidates = (
+        TransactionModel.objects.filter(timeStamp__lt=before)
+        .exclude(Exists(loan_entries))
+        .order_by("timeStamp", "id")
+        .values_list(*FIELDS)
+    )
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(candidates.select_for_update()[:batch_size])
+            if not rows:
+                return archived
+            ArchivedTransaction.objects.bulk_create(
+                [ArchivedTransaction(**dict(zip(FIELDS, row))) for row in rows]
+            )
+            TransactionModel.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
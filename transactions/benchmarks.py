@@ -0,0 +1,227 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Mod
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserAddress, UserBankAccount
+from accounts.onboarding import reserve_account_numbers
+
+from .constants import DEPOSIT, LOAN, LOAN_REQUESTED, TRANSFER_MONEY, WITHDRAW
+from .interest import accrue_interest
+from .models import TransactionModel
+from .services import approve_loan, rebuild_bank_reserve
+from .summaries import rebuild_daily_summaries
+
+HISTORY_MONTHS = 12
+
+
+def seed_bank(accounts=100, transactions=1000, batch_size=1000, seed=0):
+    """
+    Create a synthetic bank and return its accounts.
+
+    Every user shares one pre-hashed password and rows are written with
+    bulk_create, so seeding cost is dominated by the inserts themselves.
+    """
+    rng = random.Random(seed)
+    password = make_password("bench")
+    prefix = f"bench{rng.getrandbits(32):x}-"
+    users = User.objects.bulk_create(
+        [
+            User(username=f"{prefix}{i}", password=password, first_name="Bench")
+            for i in range(accounts)
+        ],
+        batch_size=batch_size,
+    )
+    bank_accounts = UserBankAccount.objects.bulk_create(
+        [
+            UserBankAccount(
+                user=user,
+                account_type="Savings",
+                account_number=number,
+                gender="Male",
+                balance=Decimal(100000),
+            )
+            for user, number in zip(users, reserve_account_numbers(accounts))
+        ],
+        batch_size=batch_size,
+    )
+    UserAddress.objects.bulk_create(
+        [
+            UserAddress(
+                user=user,
+                street_address="1 Bench Road",
+                city="Dhaka",
+                postal_code=1000,
+                country="Bangladesh",
+            )
+            for user in users
+        ],
+        batch_size=batch_size,
+    )
+
+    types = [DEPOSIT, WITHDRAW, TRANSFER_MONEY]
+    TransactionModel.objects.bulk_create(
+        (
+            TransactionModel(
+                account=rng.choice(bank_accounts),
+                transaction_type=rng.choice(types),
+                amount=Decimal(rng.randint(1, 500)),
+                balance_after_transaction=Decimal(100000),
+            )
+            for _ in range(transactions)
+        ),
+        batch_size=batch_size,
+    )
+    # auto_now_add stamps every row with the insert time; spread the history
+    # over the past year so date-range reports have something to cut through.
+    now = timezone.now()
+    history = TransactionModel.objects.filter(account__in=bank_accounts).annotate(
+        month=Mod(F("id"), HISTORY_MONTHS)
+    )
+    for month in range(1, HISTORY_MONTHS):
+        history.filter(month=month).update(timeStamp=now - timedelta(days=30 * month))
+
+    rebuild_bank_reserve()
+    rebuild_daily_summaries()
+    return bank_accounts
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def measure(client, method, url, data=None, runs=20, setup=None):
+    """
+    Issue ``runs`` requests (after one warm-up) and return the worst query
+    count and the p50/p95 latency in milliseconds. ``url`` may be a callable
+    returning a fresh URL for every request; ``setup`` runs untimed before
+    each one.
+    """
+    next_url = url if callable(url) else lambda: url
+    send = getattr(client, method)
+    send(next_url(), data)
+    queries, timings = 0, []
+    for _ in range(runs):
+        if setup:
+            setup()
+        request_url = next_url()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = send(request_url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise AssertionError(
+                f"{method.upper()} {request_url} -> {response.status_code}"
+            )
+        queries = max(queries, len(captured))
+    return {
+        "queries": queries,
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+    }
+
+
+def benchmark_views(client, account, receiver, runs=20):
+    """Drive every money-movement and report view as ``account``'s user."""
+    accounts = UserBankAccount.objects.filter(pk=account.pk)
+    client.force_login(account.user)
+    results = {
+        "deposit": measure(
+            client,
+            "post",
+            reverse("deposit"),
+            {"amount": "500", "transaction_type": DEPOSIT},
+            runs,
+        ),
+        "withdraw": measure(
+            client,
+            "post",
+            reverse("withdraw"),
+            {"amount": "10", "transaction_type": WITHDRAW},
+            runs,
+        ),
+        "transfer": measure(
+            client,
+            "post",
+            reverse("transfer"),
+            {
+                "account_number": receiver.account_number,
+                "amount": "10",
+                "transaction_type": TRANSFER_MONEY,
+            },
+            runs,
+        ),
+        "loan_request": measure(
+            client,
+            "post",
+            reverse("loan_request"),
+            {"amount": "1000", "transaction_type": LOAN},
+            runs,
+            # Keep measuring granted requests rather than the loan limit.
+            setup=lambda: accounts.update(active_loans=0),
+        ),
+        "transaction_report": measure(
+            client, "get", reverse("transaction_report"), runs=runs
+        ),
+        "transaction_report_range": measure(
+            client,
+            "get",
+            reverse("transaction_report"),
+            {
+                "start_date": (timezone.localdate() - timedelta(days=365)).isoformat(),
+                "end_date": timezone.localdate().isoformat(),
+            },
+            runs,
+        ),
+        "all_loans": measure(client, "get", reverse("all_loans"), runs=runs),
+    }
+
+    loans = list(account.loans.filter(status=LOAN_REQUESTED))
+    accounts.update(active_loans=len(loans))
+    for loan in loans:
+        approve_loan(loan)
+    loan_ids = iter(loan.pk for loan in loans)
+    results["loan_pay"] = measure(
+        client, "get", lambda: reverse("loan_pay", args=[next(loan_ids)]), runs=runs
+    )
+    return results
+
+
+def benchmark_interest(period, chunk_size=1000):
+    """
+    Accrue ``period``'s interest on the bank and return the accounts paid,
+    the worst-case query count per chunk and the accounts paid per second.
+    """
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        run = accrue_interest(period, chunk_size)
+        elapsed = time.perf_counter() - started
+    # Every chunk but the last is full; a short (or empty) one ends the run.
+    chunks = run.accounts // chunk_size + 1
+    return {
+        "accounts": run.accounts,
+        "queries_per_chunk": -(-len(captured) // chunks),
+        "accounts_per_second": run.accounts / elapsed,
+    }
+
+
+def format_results(results):
+    lines = [f"{'view':<26}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<26}{result['queries']:>8}"
+            f"{result['p50']:>10.1f}{result['p95']:>10.1f}"
+        )
+    return "\n".join(lines)
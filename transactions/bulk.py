@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from accounts.models import UserBankAccount
+from core.models import OutboxEmail
+
+from .constants import TRANSFER_MONEY, TRANSFER_RECEIVED
+from .events import append_events
+from .forms import TransferMoneyForm
+from .models import TransactionModel
+from .services import (
+    InsufficientBalance,
+    apply_balance_deltas,
+    credit_accounts,
+    lock_accounts,
+    shard_counts_of,
+)
+from .summaries import record_daily_summary
+
+# Rows are checked with the transfer form's own fields and limits.
+ACCOUNT_NUMBER_FIELD = TransferMoneyForm.base_fields["account_number"]
+AMOUNT_FIELD = TransferMoneyForm.base_fields["amount"]
+
+
+class BulkTransferResult:
+    def __init__(self):
+        self.posted = 0
+        self.total = Decimal(0)
+        self.failures = []
+        self.elapsed = 0.0
+
+    def fail(self, line, account_number, amount, reason):
+        self.failures.append(
+            {
+                "line": line,
+                "account_number": account_number,
+                "amount": str(amount),
+                "reason": reason,
+            }
+        )
+
+    @property
+    def rows_per_second(self):
+        return self.posted / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "posted": self.posted,
+            "failed": len(self.failures),
+            "total": str(self.total),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "failures": self.failures,
+        }
+
+
+def parse_transfer_rows(data, data_format="csv"):
+    """
+    Parse ``(line, account_number, amount)`` rows from a CSV body (an optional
+    ``account_number,amount`` header is skipped) or a JSON list of objects.
+    Raises ValueError if the payload itself is malformed.
+    """
+    if data_format == "json":
+        # Decimal keeps amounts exact and lets float account numbers fail.
+        items = json.loads(data, parse_float=Decimal)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON list of transfers")
+        try:
+            return [
+                (line, item["account_number"], item["amount"])
+                for line, item in enumerate(items, start=1)
+            ]
+        except (KeyError, TypeError):
+            raise ValueError("Each transfer needs account_number and amount")
+
+    rows = []
+    for line, record in enumerate(csv.reader(io.StringIO(data)), start=1):
+        if not record or (line == 1 and record[0].strip() == "account_number"):
+            continue
+        if len(record) != 2:
+            raise ValueError(f"Line {line}: expected account_number,amount")
+        rows.append((line, record[0].strip(), record[1].strip()))
+    return rows
+
+
+def post_bulk_transfer(sender, rows, chunk_size=500):
+    """
+    Pay every ``(line, account_number, amount)`` row from ``sender``.
+
+    Receivers are resolved with one query and each chunk is posted in its
+    own transaction with a fixed number of statements. A chunk the sender
+    cannot cover fails as a whole; rows already posted stay posted.
+    """
+    started = time.perf_counter()
+    result = BulkTransferResult()
+
+    valid = []
+    for line, account_number, amount in rows:
+        # bool is an int, and a float would be truncated or rounded.
+        if (
+            isinstance(account_number, bool)
+            or not isinstance(account_number, (int, str))
+            or isinstance(amount, bool)
+            or not isinstance(amount, (int, str, Decimal))
+        ):
+            result.fail(line, account_number, amount, "Invalid row")
+            continue
+        try:
+            account_number = ACCOUNT_NUMBER_FIELD.clean(account_number)
+            amount = AMOUNT_FIELD.clean(amount)
+        except ValidationError as error:
+            result.fail(line, account_number, amount, error.messages[0])
+            continue
+        if amount <= 0:
+            result.fail(
+                line, account_number, amount, "Amount must be greater than zero"
+            )
+            continue
+        valid.append((line, account_number, amount))
+
+    receivers = UserBankAccount.objects.select_related("user").in_bulk(
+        {account_number for _, account_number, _ in valid},
+        field_name="account_number",
+    )
+    resolved = []
+    for line, account_number, amount in valid:
+        receiver = receivers.get(account_number)
+        if receiver is None:
+            result.fail(line, account_number, amount, "Invalid Account No")
+        elif receiver.pk == sender.pk:
+            result.fail(
+                line,
+                account_number,
+                amount,
+                "Cannot transfer money to your own account",
+            )
+        else:
+            resolved.append((line, receiver, amount))
+
+    for start in range(0, len(resolved), chunk_size):
+        chunk = resolved[start : start + chunk_size]
+        try:
+            _post_chunk(sender, chunk)
+        except InsufficientBalance:
+            for line, receiver, amount in chunk:
+                result.fail(
+                    line, receiver.account_number, amount, "Insufficient Balance"
+                )
+        else:
+            result.posted += len(chunk)
+            result.total += sum(amount for _, _, amount in chunk)
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+@transaction.atomic
+def _post_chunk(sender, chunk):
+    credits = defaultdict(Decimal)
+    for _, receiver, amount in chunk:
+        credits[receiver.pk] += amount
+    total = sum(credits.values())
+
+    lock_accounts([sender.pk, *credits])
+    sender_balance = apply_balance_deltas(
+        {sender.pk: -total}, shard_counts_of([sender])
+    )[sender.pk]
+    balances = credit_accounts(credits)
+
+    # Rebuild the running balance each leg leaves behind.
+    running = {pk: balances[pk] - credits[pk] for pk in credits}
+    running_sender = sender_balance + total
+    legs, emails = [], []
+    for _, receiver, amount in chunk:
+        running_sender -= amount
+        running[receiver.pk] += amount
+        legs.append(
+            TransactionModel(
+                account=sender,
+                transaction_type=TRANSFER_MONEY,
+                amount=amount,
+                balance_after_transaction=running_sender,
+            )
+        )
+        legs.append(
+            TransactionModel(
+                account=receiver,
+                transaction_type=TRANSFER_RECEIVED,
+                amount=amount,
+                balance_after_transaction=running[receiver.pk],
+            )
+        )
+    TransactionModel.objects.bulk_create(legs)
+    record_daily_summary(legs)
+    append_events(legs)
+
+    for _, receiver, amount in chunk:
+        receiver.balance = balances[receiver.pk]
+        emails.append(
+            OutboxEmail(
+                subject="Money Revived Message",
+                to=receiver.user.email,
+                html_body=render_to_string(
+                    "transactions/deposite_mail.html",
+                    {"user": receiver.user, "amount": amount},
+                ),
+            )
+        )
+    OutboxEmail.objects.bulk_create(emails)
+    sender.balance = sender_balance
@@ -0,0 +1,336 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import BalanceShard, UserBankAccount
+from accounts.snapshots import invalidate_account_snapshots
+
+from .archive import combine, ledger_parts
+from .constants import DEBIT_TYPES
+from .models import BalanceCheckpoint, TransactionModel
+
+AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+
+
+def signed_amount():
+    """How a ledger row moved the balance: negative for debits."""
+    return Case(
+        When(transaction_type__in=DEBIT_TYPES, then=-F("amount")),
+        default=F("amount"),
+        output_field=AMOUNT,
+    )
+
+
+def _signed(transaction_type, amount):
+    return -amount if transaction_type in DEBIT_TYPES else amount
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _delta(account, start, end):
+    return sum(
+        part.aggregate(total=Sum(signed_amount()))["total"] or 0
+        for part in ledger_parts(start, end, account=account)
+    )
+
+
+def balance_at(account, when):
+    """
+    Return the balance after every ledger row stamped before ``when``.
+
+    One seek finds the latest checkpoint at or before ``when`` and only the
+    rows since it are summed. Before the first checkpoint the sum runs back
+    from the earliest one, and without any from the current balance.
+    """
+    checkpoints = account.balance_checkpoints.order_by("as_of")
+    checkpoint = checkpoints.filter(as_of__lte=when).last()
+    if checkpoint is not None:
+        return checkpoint.balance + _delta(account, checkpoint.as_of, when)
+    checkpoint = checkpoints.first()
+    if checkpoint is not None:
+        return checkpoint.balance - _delta(account, when, checkpoint.as_of)
+    return account.current_balance - _delta(account, when, None)
+
+
+def balance_on(account, day):
+    """Return the balance at the end of ``day``."""
+    return balance_at(account, start_of_day(day + timedelta(days=1)))
+
+
+def take_balance_checkpoints(as_of=None, batch_size=1000):
+    """
+    Checkpoint every account with ledger rows since its last checkpoint.
+
+    ``as_of`` defaults to the start of today, so run it after midnight once
+    the day's postings have committed. A checkpoint is the previous one plus
+    the rows in between; an account's first one is worked back from its
+    current balance. Rows whose running balance disagrees are rewritten on
+    the way, which settles the provisional balances of hot-account credits.
+    Returns ``(checkpoints, rows_repaired)``.
+    """
+    as_of = as_of or start_of_day(timezone.localdate())
+    latest = BalanceCheckpoint.objects.filter(account=OuterRef("pk")).order_by("-as_of")
+    rows = TransactionModel.objects.filter(account=OuterRef("pk"), timeStamp__lt=as_of)
+    accounts = (
+        UserBankAccount.objects.annotate(
+            since=Subquery(latest.values("as_of")[:1]),
+            since_balance=Subquery(latest.values("balance")[:1]),
+        )
+        .alias(
+            has_rows=Exists(rows),
+            has_new_rows=Exists(rows.filter(timeStamp__gte=OuterRef("since"))),
+        )
+        .filter(
+            Q(since__isnull=True, has_rows=True) | Q(since__lt=as_of, has_new_rows=True)
+        )
+        .order_by("pk")
+        .values_list("pk", "since", "since_balance")
+    )
+
+    checkpoints = repaired = 0
+    last_pk = 0
+    while batch := list(accounts.filter(pk__gt=last_pk)[:batch_size]):
+        last_pk = batch[-1][0]
+        balances, fixes = _walk_new_accounts(
+            [pk for pk, since, _ in batch if since is None], as_of
+        )
+        chained, chained_fixes = _walk_chained_accounts(
+            {pk: (since, balance) for pk, since, balance in batch if since}, as_of
+        )
+        balances.update(chained)
+        fixes += chained_fixes
+        with transaction.atomic():
+            TransactionModel.objects.bulk_update(
+                fixes, ["balance_after_transaction"], batch_size=batch_size
+            )
+            # Cached report pages show the old running balances.
+            invalidate_account_snapshots(
+                UserBankAccount.objects.filter(
+                    pk__in={fix.account_id for fix in fixes}
+                ).values_list("user_id", flat=True)
+            )
+            BalanceCheckpoint.objects.bulk_create(
+                [
+                    BalanceCheckpoint(account_id=pk, as_of=as_of, balance=balance)
+                    for pk, balance in balances.items()
+                ],
+                ignore_conflicts=True,
+            )
+        checkpoints += len(balances)
+        repaired += len(fixes)
+    return checkpoints, repaired
+
+
+def _fix(pk, account_id, balance):
+    return TransactionModel(
+        pk=pk, account_id=account_id, balance_after_transaction=balance
+    )
+
+
+def _walk_new_accounts(account_ids, as_of):
+    # One statement reads the balance, the shards and the later rows, so they
+    # agree with each other even while postings carry on.
+    if not account_ids:
+        return {}, []
+    later = (
+        TransactionModel.objects.filter(account=OuterRef("pk"), timeStamp__gte=as_of)
+        .values("account")
+        .annotate(total=Sum(signed_amount()))
+        .values("total")
+    )
+    shards = (
+        BalanceShard.objects.filter(account=OuterRef("pk"))
+        .values("account")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    zero = Value(Decimal(0), output_field=AMOUNT)
+    balances = dict(
+        UserBankAccount.objects.filter(pk__in=account_ids)
+        .annotate(
+            at=F("balance")
+            + Coalesce(Subquery(shards), zero)
+            - Coalesce(Subquery(later), zero)
+        )
+        .values_list("pk", "at")
+    )
+
+    # Walk each account's history backwards from the checkpoint.
+    rows = (
+        TransactionModel.objects.filter(account_id__in=account_ids, timeStamp__lt=as_of)
+        .order_by("account_id", "-timeStamp", "-id")
+        .values_list(
+            "pk",
+            "account_id",
+            "transaction_type",
+            "amount",
+            "balance_after_transaction",
+        )
+    )
+    fixes, account_id, running = [], None, None
+    for pk, row_account_id, transaction_type, amount, balance_after in rows.iterator():
+        if row_account_id != account_id:
+            account_id, running = row_account_id, balances[row_account_id]
+        if balance_after != running:
+            fixes.append(_fix(pk, account_id, running))
+        running -= _signed(transaction_type, amount)
+    return balances, fixes
+
+
+def _walk_chained_accounts(since, as_of):
+    # Walk the rows since each account's last checkpoint forwards from it.
+    if not since:
+        return {}, []
+    balances = {pk: balance for pk, (_, balance) in since.items()}
+    rows = (
+        TransactionModel.objects.filter(
+            account_id__in=since,
+            timeStamp__gte=min(start for start, _ in since.values()),
+            timeStamp__lt=as_of,
+        )
+        .order_by("account_id", "timeStamp", "id")
+        .values_list(
+            "pk",
+            "account_id",
+            "transaction_type",
+            "amount",
+            "timeStamp",
+            "balance_after_transaction",
+        )
+    )
+    fixes = []
+    for (
+        pk,
+        account_id,
+        transaction_type,
+        amount,
+        stamp,
+        balance_after,
+    ) in rows.iterator():
+        if stamp < since[account_id][0]:
+            continue
+        balances[account_id] += _signed(transaction_type, amount)
+        if balance_after != balances[account_id]:
+            fixes.append(_fix(pk, account_id, balances[account_id]))
+    return balances, fixes
+
+
+def verify_balance_checkpoints(batch_size=1000):
+    """
+    Replay the ledger, archive included, of every checkpointed account.
+
+    Each row's running balance and each checkpoint must follow from the rows
+    before it. Rows after an account's last checkpoint are not checked: hot
+    accounts' running balances there are still provisional. After a mismatch
+    the replay carries on from the stored value, so one bad row is reported
+    once. Returns a summary dict with a list of mismatches.
+    """
+    result = {"accounts": 0, "checkpoints": 0, "rows": 0, "mismatches": []}
+    account_ids = (
+        BalanceCheckpoint.objects.order_by("account_id")
+        .values_list("account_id", flat=True)
+        .distinct()
+    )
+    last_pk = 0
+    while batch := list(account_ids.filter(account_id__gt=last_pk)[:batch_size]):
+        last_pk = batch[-1]
+        checkpoints = {}
+        for checkpoint in BalanceCheckpoint.objects.filter(
+            account_id__in=batch
+        ).order_by("account_id", "as_of"):
+            checkpoints.setdefault(checkpoint.account_id, []).append(checkpoint)
+        _verify_batch(checkpoints, result)
+        result["accounts"] += len(batch)
+    return result
+
+
+def _verify_batch(checkpoints, result):
+    mismatches = result["mismatches"]
+    parts = ledger_parts(
+        end=max(pending[-1].as_of for pending in checkpoints.values()),
+        account_id__in=checkpoints,
+    )
+    rows = (
+        combine(
+            [
+                part.values_list(
+                    "id",
+                    "account_id",
+                    "transaction_type",
+                    "amount",
+                    "timeStamp",
+                    "balance_after_transaction",
+                )
+                for part in parts
+            ]
+        )
+        .order_by("account_id", "timeStamp", "id")
+        .iterator()
+    )
+    state = {pk: [None, list(pending)] for pk, pending in checkpoints.items()}
+
+    def check_checkpoints(account_id, before=None):
+        running, pending = state[account_id]
+        while pending and (before is None or pending[0].as_of <= before):
+            checkpoint = pending.pop(0)
+            result["checkpoints"] += 1
+            if running is not None and running != checkpoint.balance:
+                mismatches.append(
+                    {
+                        "account_id": account_id,
+                        "checkpoint_id": checkpoint.pk,
+                        "expected": running,
+                        "found": checkpoint.balance,
+                    }
+                )
+            state[account_id][0] = running = checkpoint.balance
+
+    for (
+        pk,
+        account_id,
+        transaction_type,
+        amount,
+        stamp,
+        balance_after,
+    ) in rows:
+        check_checkpoints(account_id, before=stamp)
+        running, pending = state[account_id]
+        if not pending:
+            continue
+        delta = _signed(transaction_type, amount)
+        if running is None:
+            # The account's first row anchors the replay.
+            running = balance_after - delta
+        running += delta
+        result["rows"] += 1
+        if balance_after != running:
+            mismatches.append(
+                {
+                    "account_id": account_id,
+                    "transaction_id": pk,
+                    "expected": running,
+                    "found": balance_after,
+                }
+            )
+            running = balance_after
+        state[account_id][0] = running
+
+    for account_id in state:
+        check_checkpoints(account_id)
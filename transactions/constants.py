@@ -3,6 +3,8 @@ WITHDRAW = 2
 LOAN = 3
 LOAN_PAID = 4
 TRANSFER_MONEY = 5
+TRANSFER_RECEIVED = 6
+INTEREST = 7
 
 
 TRANSACTION_TYPE = (
@@ -11,4 +13,38 @@ TRANSACTION_TYPE = (
     (LOAN, "Loan"),
     (LOAN_PAID, "Loan Paid"),
     (TRANSFER_MONEY, "TRANSFER MONEY "),
+    (TRANSFER_RECEIVED, "Money Received"),
+    (INTEREST, "Interest"),
 )
+
+# Entries of these types take money out of the account.
+DEBIT_TYPES = (WITHDRAW, LOAN_PAID, TRANSFER_MONEY)
+
+TRANSACTION_TYPE_NAMES = dict(TRANSACTION_TYPE)
+
+# Report badges: red for debits, green for everything else.
+TRANSACTION_BADGE_CLASSES = {
+    transaction_type: (
+        "text-red-700 bg-red-100"
+        if transaction_type in DEBIT_TYPES
+        else "text-green-700 bg-green-100"
+    )
+    for transaction_type, _ in TRANSACTION_TYPE
+}
+
+LOAN_REQUESTED = 1
+LOAN_APPROVED = 2
+LOAN_REPAID = 3
+
+LOAN_STATUS = (
+    (LOAN_REQUESTED, "Pending"),
+    (LOAN_APPROVED, "Approved"),
+    (LOAN_REPAID, "Paid"),
+)
+
+# Requested and approved loans both count until they are repaid.
+MAX_ACTIVE_LOANS = 3
+
+# The bank reserve is split over a few rows so that concurrent postings
+# don't all queue on the same row lock; reading it sums this many rows.
+RESERVE_SLOTS = 8
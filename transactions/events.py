@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.utils import timezone
+
+from .constants import TRANSACTION_TYPE
+from .models import ConsumerOffset, TransactionEvent
+
+FIELDS = [
+    "id",
+    "transaction_id",
+    "account__account_number",
+    "transaction_type",
+    "amount",
+    "balance_after_transaction",
+    "timeStamp",
+    "created_at",
+]
+
+
+def append_events(rows):
+    """
+    Append an event for each ledger row just written.
+
+    Call it in the same transaction that wrote the rows, after they have
+    their ids, so an event is visible exactly when its row is.
+    """
+    TransactionEvent.objects.bulk_create(
+        [
+            TransactionEvent(
+                transaction_id=row.pk,
+                account_id=row.account_id,
+                transaction_type=row.transaction_type,
+                amount=row.amount,
+                balance_after_transaction=row.balance_after_transaction,
+                timeStamp=row.timeStamp,
+            )
+            for row in rows
+        ]
+    )
+
+
+def read_events(after=0, limit=1000):
+    """
+    Return up to ``limit`` events with a sequence number above ``after``.
+
+    Sequence numbers are handed out on insert, so a posting can commit after
+    one that took a later number. A gap younger than TRANSACTION_EVENT_SETTLE
+    may still fill in and the read stops before it; older gaps belong to
+    postings that rolled back. Reading from the last returned sequence thus
+    sees every event exactly once, with one index range scan per batch.
+    """
+    rows = (
+        TransactionEvent.objects.filter(pk__gt=after)
+        .order_by("pk")
+        .values_list(*FIELDS)[:limit]
+    )
+    settled = timezone.now() - settings.TRANSACTION_EVENT_SETTLE
+    type_names = dict(TRANSACTION_TYPE)
+    events, expected = [], after + 1
+    for sequence, pk, number, transaction_type, amount, balance, stamp, created in rows:
+        if sequence != expected and created > settled:
+            break
+        expected = sequence + 1
+        events.append(
+            {
+                "sequence": sequence,
+                "transaction_id": pk,
+                "account_number": number,
+                "transaction_type": type_names.get(transaction_type),
+                "amount": str(amount),
+                "balance_after_transaction": str(balance),
+                "timeStamp": stamp.isoformat(),
+            }
+        )
+    return events
+
+
+def consumer_offset(group):
+    """The last sequence ``group`` committed, 0 for a new group."""
+    offset = ConsumerOffset.objects.filter(group=group)
+    return offset.values_list("position", flat=True).first() or 0
+
+
+def commit_offset(group, position):
+    """Move ``group``'s offset forward to ``position``; it never moves back."""
+    offsets = ConsumerOffset.objects.filter(group=group, position__lt=position)
+    changes = {"position": position, "updated_at": timezone.now()}
+    if not offsets.update(**changes):
+        ConsumerOffset.objects.get_or_create(group=group)
+        offsets.update(**changes)
@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import TransactionModel
+from .services import post_entry
 
 
 class TransactionForm(forms.ModelForm):
@@ -15,9 +16,10 @@ class TransactionForm(forms.ModelForm):
         self.fields["transaction_type"].widget = forms.HiddenInput()
 
     def save(self, commit=True):
+        # Posted through the ledger, so the row records the balance its own
+        # update produced rather than the one read before it.
         self.instance.account = self.account
-        self.instance.balance_after_transaction = self.account.balance
-        return super().save()
+        return post_entry(self.instance)
 
 
 class DepositForm(TransactionForm):
@@ -48,7 +50,7 @@ class WithdrawForm(TransactionForm):
     def clean_amount(self):
         amount = self.cleaned_data.get("amount")
         account = self.account
-        balance = account.balance
+        balance = account.current_balance
 
         if amount <= 0:
             raise forms.ValidationError("Amount must be greater than zero.")
@@ -61,4 +63,6 @@ class WithdrawForm(TransactionForm):
 class LoanRequestForm(TransactionForm):
     def clean_amount(self):
         amount = self.cleaned_data.get("amount")
+        if amount <= 0:
+            raise forms.ValidationError("Amount must be greater than zero.")
         return amount
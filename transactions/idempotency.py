@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+
+
+def get_idempotency_key(request):
+    return request.headers.get("Idempotency-Key") or request.POST.get("idempotency_key")
+
+
+def find_result(user, key):
+    """Return the stored result for ``key`` if it is still live, else None."""
+    cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+    return IdempotencyKey.objects.filter(
+        user=user, key=key, created_at__gte=cutoff
+    ).first()
+
+
+def claim_key(user, key, path):
+    """
+    Insert ``key`` for ``user``, replacing it only if it has expired.
+
+    Raises IntegrityError if another request already holds a live key.
+    """
+    cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+    IdempotencyKey.objects.filter(user=user, key=key, created_at__lt=cutoff).delete()
+    return IdempotencyKey.objects.create(user=user, key=key, path=path)
+
+
+def prune_idempotency_keys(batch_size=1000):
+    """Delete expired keys in bounded batches and return how many went."""
+    cutoff = timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+    expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        batch = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
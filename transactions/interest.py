@@ -0,0 +1,119 @@
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.constants import SAVINGS
+from accounts.models import BalanceShard, UserBankAccount
+
+from .checkpoints import AMOUNT
+from .constants import INTEREST
+from .events import append_events
+from .models import InterestRun, TransactionModel
+from .services import adjust_reserve, credit_accounts
+from .summaries import record_daily_summary
+
+CENT = Decimal("0.01")
+
+
+def previous_period(today=None):
+    """The first day of the month before ``today``'s."""
+    first = (today or timezone.localdate()).replace(day=1)
+    return (first - timedelta(days=1)).replace(day=1)
+
+
+def monthly_interest(balance, annual_rate):
+    return (balance * annual_rate / 12).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def accrue_interest(period=None, chunk_size=1000):
+    """
+    Pay a month's interest on every Savings account, ``chunk_size`` at a time.
+
+    ``period`` is any day of the month, by default the previous one; run it
+    once that month is over. Each chunk locks its accounts, credits them with
+    one CASE update, bulk inserts their ledger rows and moves the run's
+    cursor past them in one transaction, so a run that stops part way picks
+    up from the cursor and one that finished is not paid twice. Interest is
+    on the balance, shards included, when the chunk is posted. Raises
+    ValueError for a month that has not ended. Returns the InterestRun.
+    """
+    period = (period or previous_period()).replace(day=1)
+    if period >= timezone.localdate().replace(day=1):
+        raise ValueError(f"{period:%Y-%m} has not ended yet")
+    savings = UserBankAccount.objects.filter(account_type=SAVINGS)
+
+    def last_account_id():
+        return savings.aggregate(last=Max("pk"))["last"] or 0
+
+    # Callable defaults are only evaluated when this call starts the run.
+    run, _ = InterestRun.objects.get_or_create(
+        period=period,
+        defaults={
+            "annual_rate": settings.SAVINGS_INTEREST_RATE,
+            "through_account_id": last_account_id,
+        },
+    )
+    while run.completed_at is None:
+        run = _accrue_chunk(run.pk, savings, chunk_size)
+    return run
+
+
+@transaction.atomic
+def _accrue_chunk(run_pk, savings, chunk_size):
+    # Locking the run first keeps two workers off the same period.
+    run = InterestRun.objects.select_for_update().get(pk=run_pk)
+    if run.completed_at is not None:
+        return run
+    shards = (
+        BalanceShard.objects.filter(account=OuterRef("pk"))
+        .values("account")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    accounts = list(
+        savings.select_for_update()
+        .filter(pk__gt=run.last_account_id, pk__lte=run.through_account_id)
+        .annotate(
+            held=F("balance")
+            + Coalesce(Subquery(shards), Value(Decimal(0), output_field=AMOUNT))
+        )
+        .order_by("pk")
+        .values_list("pk", "held")[:chunk_size]
+    )
+
+    credits, rows = {}, []
+    for account_id, held in accounts:
+        interest = monthly_interest(held, run.annual_rate)
+        if interest <= 0:
+            continue
+        credits[account_id] = interest
+        rows.append(
+            TransactionModel(
+                account_id=account_id,
+                transaction_type=INTEREST,
+                amount=interest,
+                balance_after_transaction=held + interest,
+            )
+        )
+    if credits:
+        credit_accounts(credits)
+        TransactionModel.objects.bulk_create(rows)
+        record_daily_summary(rows)
+        append_events(rows)
+        total = sum(credits.values())
+        adjust_reserve(total)
+        run.accounts += len(credits)
+        run.total += total
+
+    if len(accounts) < chunk_size:
+        run.last_account_id = run.through_account_id
+        run.completed_at = timezone.now()
+    else:
+        run.last_account_id = accounts[-1][0]
+    run.save()
+    return run
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.interest import accrue_interest
+
+
+def month(value):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+class Command(BaseCommand):
+    help = (
+        "Pay a month's interest (default last month's) on Savings accounts;"
+        " an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", type=month, help="The month, as YYYY-MM.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            run = accrue_interest(options["period"], chunk_size=options["chunk_size"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Interest for {run.period:%Y-%m}: {run.total} paid to"
+                f" {run.accounts} accounts at {run.annual_rate} a year"
+            )
+        )
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from transactions.archive import archive_transactions
+from transactions.checkpoints import start_of_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Move ledger rows older than TRANSACTION_ARCHIVE_AFTER_DAYS (or --before)"
+        " to the archive table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", type=date.fromisoformat)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        before = start_of_day(options["before"]) if options["before"] else None
+        archived = archive_transactions(before, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} transactions"))
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import UserBankAccount
+from transactions.bulk import parse_transfer_rows, post_bulk_transfer
+
+
+class Command(BaseCommand):
+    help = "Pay a CSV or JSON list of (account_number, amount) from one account."
+
+    def add_arguments(self, parser):
+        parser.add_argument("sender", type=int, help="Paying account number.")
+        parser.add_argument("path", help="CSV or JSON file of transfers.")
+        parser.add_argument("--format", choices=["csv", "json"])
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            sender = UserBankAccount.objects.get(account_number=options["sender"])
+        except UserBankAccount.DoesNotExist:
+            raise CommandError(f"Account {options['sender']} does not exist")
+
+        path = Path(options["path"])
+        data_format = options["format"] or ("json" if path.suffix == ".json" else "csv")
+        try:
+            rows = parse_transfer_rows(path.read_text(), data_format)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        result = post_bulk_transfer(sender, rows, options["chunk_size"])
+        self.stdout.write(json.dumps(result.as_dict(), indent=2))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from transactions.services import compact_balance_shards
+
+
+class Command(BaseCommand):
+    help = "Fold the balance shards of hot accounts into their balances."
+
+    def handle(self, *args, **options):
+        compacted = compact_balance_shards()
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} accounts"))
@@ -0,0 +1,38 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions.events import commit_offset, consumer_offset, read_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a consumer group's new transaction events to stdout as JSON lines,"
+        " committing its offset after each batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("group")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--follow", action="store_true", help="Keep polling for new events."
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        group, batch_size = options["group"], options["batch_size"]
+        position = consumer_offset(group)
+        while True:
+            events = read_events(position, batch_size)
+            for event in events:
+                self.stdout.write(json.dumps(event))
+            if events:
+                # Delivery is at least once: a crash before this line replays
+                # the batch.
+                position = events[-1]["sequence"]
+                commit_offset(group, position)
+            if len(events) < batch_size:
+                if not options["follow"]:
+                    return
+                time.sleep(options["poll_interval"])
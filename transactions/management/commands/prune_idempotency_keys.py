@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from transactions.idempotency import prune_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Delete idempotency keys older than IDEMPOTENCY_KEY_TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = prune_idempotency_keys(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} idempotency keys"))
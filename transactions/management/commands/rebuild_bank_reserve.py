@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from transactions.services import rebuild_bank_reserve
+
+
+class Command(BaseCommand):
+    help = "Rebuild the bank reserve total from the account balances."
+
+    def handle(self, *args, **options):
+        total = rebuild_bank_reserve()
+        self.stdout.write(self.style.SUCCESS(f"Bank reserve rebuilt: {total}"))
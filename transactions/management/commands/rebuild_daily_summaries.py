@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from transactions.summaries import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily per-account transaction summaries from the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_daily_summaries(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily summaries"))
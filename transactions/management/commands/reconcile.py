@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Check every account balance against its initial amount plus its "
+        "ledger history, archive included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Split the accounts by id range over this many processes.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        result = reconcile(options["workers"], options["chunk_size"])
+        self.stdout.write(json.dumps(result.as_dict(), indent=2))
+        if result.mismatches:
+            raise CommandError(f"{len(result.mismatches)} accounts do not reconcile")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import UserBankAccount
+from transactions.services import set_balance_shards
+
+
+class Command(BaseCommand):
+    help = "Spread an account's credits over N balance shards (0 turns it off)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("account_number", type=int)
+        parser.add_argument("shard_count", type=int)
+
+    def handle(self, *args, **options):
+        if not 0 <= options["shard_count"] <= 256:
+            raise CommandError("shard_count must be between 0 and 256")
+        try:
+            account = UserBankAccount.objects.get(
+                account_number=options["account_number"]
+            )
+        except UserBankAccount.DoesNotExist:
+            raise CommandError("No account with that number")
+        set_balance_shards(account, options["shard_count"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Account {account} now has {account.shard_count} balance shards"
+            )
+        )
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from transactions.checkpoints import start_of_day, take_balance_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Checkpoint account balances as of the start of a day (default today)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=date.fromisoformat)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        as_of = start_of_day(options["date"]) if options["date"] else None
+        checkpoints, repaired = take_balance_checkpoints(
+            as_of, batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Took {checkpoints} checkpoints, repaired {repaired} running balances"
+            )
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.checkpoints import verify_balance_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Replay the ledger and check it against the balance checkpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        result = verify_balance_checkpoints(options["batch_size"])
+        for mismatch in result["mismatches"]:
+            self.stderr.write(
+                " ".join(f"{key}={value}" for key, value in mismatch.items())
+            )
+        summary = (
+            f"Checked {result['checkpoints']} checkpoints and {result['rows']} rows"
+            f" across {result['accounts']} accounts"
+        )
+        if result["mismatches"]:
+            raise CommandError(f"{summary}; mismatches: {len(result['mismatches'])}")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_alter_transactionmodel_transaction_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transactionmodel',
+            name='transaction_type',
+            field=models.IntegerField(choices=[(1, 'Deposite'), (2, 'Withdraw'), (3, 'Loan'), (4, 'Loan Paid'), (5, 'TRANSFER MONEY '), (6, 'Money Received')], null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+RESERVE_SLOTS = 8
+
+
+def seed_reserve(apps, schema_editor):
+    BankReserve = apps.get_model('transactions', 'BankReserve')
+    UserBankAccount = apps.get_model('accounts', 'UserBankAccount')
+    total = UserBankAccount.objects.aggregate(total=Sum('balance'))['total'] or 0
+    BankReserve.objects.bulk_create(
+        [BankReserve(slot=slot, total=total if slot == 0 else 0) for slot in range(RESERVE_SLOTS)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_rename_userbanckaccount_userbankaccount'),
+        ('transactions', '0003_transfer_received'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankReserve',
+            fields=[
+                ('slot', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.RunPython(seed_reserve, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_rename_userbanckaccount_userbankaccount'),
+        ('transactions', '0004_bankreserve'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactionmodel',
+            index=models.Index(fields=['account', 'timeStamp', 'id'], name='txn_account_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionmodel',
+            index=models.Index(fields=['account', 'transaction_type', 'timeStamp'], include=['loan_approve'], name='txn_account_type_idx'),
+        ),
+        migrations.AlterField(
+            model_name='transactionmodel',
+            name='account',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='accounts.userbankaccount'),
+        ),
+    ]
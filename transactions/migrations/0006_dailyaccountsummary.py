@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_summaries(apps, schema_editor):
+    DailyAccountSummary = apps.get_model('transactions', 'DailyAccountSummary')
+    TransactionModel = apps.get_model('transactions', 'TransactionModel')
+    rows = (
+        TransactionModel.objects.filter(transaction_type__isnull=False)
+        .annotate(date=TruncDate('timeStamp'))
+        .values('account_id', 'date', 'transaction_type')
+        .annotate(count=Count('id'), total=Sum('amount'))
+        .order_by()
+    )
+    DailyAccountSummary.objects.bulk_create(
+        (DailyAccountSummary(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_rename_userbanckaccount_userbankaccount'),
+        ('transactions', '0005_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAccountSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.IntegerField(choices=[(1, 'Deposite'), (2, 'Withdraw'), (3, 'Loan'), (4, 'Loan Paid'), (5, 'TRANSFER MONEY '), (6, 'Money Received')])),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('account', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='accounts.userbankaccount')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'date', 'transaction_type'), name='daily_summary_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:55
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+LOAN = 3
+LOAN_PAID = 4
+LOAN_REQUESTED = 1
+LOAN_APPROVED = 2
+LOAN_REPAID = 3
+
+
+def move_loans_out_of_ledger(apps, schema_editor):
+    """
+    Give every loan row a Loan. Approved loans keep their row as the
+    disbursement. A LOAN_PAID row was credited on approval before its type
+    was rewritten, so it becomes the disbursement again and a LOAN_PAID row
+    with the same stamp is added as the repayment. Pending requests never
+    moved money, so their rows leave the ledger and the daily summary.
+    """
+    DailyAccountSummary = apps.get_model('transactions', 'DailyAccountSummary')
+    Loan = apps.get_model('transactions', 'Loan')
+    TransactionModel = apps.get_model('transactions', 'TransactionModel')
+    UserBankAccount = apps.get_model('accounts', 'UserBankAccount')
+
+    loans, pending, repaid = [], [], []
+    active = Counter()
+    # (account_id, date) -> change to the LOAN summary row.
+    buckets = defaultdict(lambda: [0, 0])
+    rows = TransactionModel.objects.filter(transaction_type__in=[LOAN, LOAN_PAID])
+    for row in rows.order_by('pk').iterator():
+        loan = Loan(account_id=row.account_id, amount=row.amount, requested_at=row.timeStamp)
+        bucket = buckets[(row.account_id, timezone.localdate(row.timeStamp))]
+        if row.transaction_type == LOAN_PAID:
+            loan.status = LOAN_REPAID
+            loan.approved_at = loan.paid_at = row.timeStamp
+            loan.disbursement_id = row.pk
+            repaid.append((loan, row))
+            bucket[0] += 1
+            bucket[1] += row.amount
+        elif row.loan_approve:
+            loan.status = LOAN_APPROVED
+            loan.approved_at = row.timeStamp
+            loan.disbursement_id = row.pk
+            active[row.account_id] += 1
+        else:
+            pending.append(row.pk)
+            active[row.account_id] += 1
+            bucket[0] -= 1
+            bucket[1] -= row.amount
+        loans.append(loan)
+
+    # The repayment keeps the row's balance, which payment rewrote; the
+    # disbursement before it left the balance higher by the amount. A later
+    # id with the same stamp orders the repayment after the disbursement.
+    repayments = TransactionModel.objects.bulk_create(
+        [
+            TransactionModel(
+                account_id=row.account_id,
+                transaction_type=LOAN_PAID,
+                amount=row.amount,
+                balance_after_transaction=row.balance_after_transaction,
+            )
+            for _, row in repaid
+        ],
+        batch_size=1000,
+    )
+    for repayment, (loan, row) in zip(repayments, repaid):
+        repayment.timeStamp = row.timeStamp
+        loan.repayment_id = repayment.pk
+    TransactionModel.objects.bulk_update(repayments, ['timeStamp'], batch_size=1000)
+    TransactionModel.objects.filter(pk__in=[row.pk for _, row in repaid]).update(
+        transaction_type=LOAN,
+        balance_after_transaction=F('balance_after_transaction') + F('amount'),
+    )
+    Loan.objects.bulk_create(loans, batch_size=1000)
+
+    TransactionModel.objects.filter(pk__in=pending).delete()
+    for (account_id, date), (count, total) in buckets.items():
+        if not count and not total:
+            continue
+        DailyAccountSummary.objects.get_or_create(
+            account_id=account_id, date=date, transaction_type=LOAN
+        )
+        DailyAccountSummary.objects.filter(
+            account_id=account_id, date=date, transaction_type=LOAN
+        ).update(count=F('count') + count, total=F('total') + total)
+    for account_id, count in active.items():
+        UserBankAccount.objects.filter(pk=account_id).update(active_loans=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userbankaccount_active_loans'),
+        ('transactions', '0007_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Loan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Pending'), (2, 'Approved'), (3, 'Paid')], default=1)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('approved_at', models.DateTimeField(blank=True, null=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('account', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='accounts.userbankaccount')),
+                ('disbursement', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='+', to='transactions.transactionmodel')),
+                ('repayment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='+', to='transactions.transactionmodel')),
+            ],
+            options={
+                'ordering': ['requested_at'],
+                'indexes': [models.Index(fields=['account', 'requested_at'], name='loan_account_time_idx')],
+            },
+        ),
+        migrations.RunPython(move_loans_out_of_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_loan'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transactionmodel',
+            name='txn_account_type_idx',
+        ),
+        migrations.RemoveField(
+            model_name='transactionmodel',
+            name='loan_approve',
+        ),
+    ]
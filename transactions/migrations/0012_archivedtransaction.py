@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_balance_shards'),
+        ('transactions', '0011_balancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_type', models.IntegerField(choices=[(1, 'Deposite'), (2, 'Withdraw'), (3, 'Loan'), (4, 'Loan Paid'), (5, 'TRANSFER MONEY '), (6, 'Money Received')], null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after_transaction', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('timeStamp', models.DateTimeField()),
+                ('account', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='accounts.userbankaccount')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'timeStamp', 'id'], name='archive_account_time_idx')],
+            },
+        ),
+    ]
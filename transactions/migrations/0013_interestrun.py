@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0012_archivedtransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(unique=True)),
+                ('annual_rate', models.DecimalField(decimal_places=5, max_digits=6)),
+                ('through_account_id', models.BigIntegerField()),
+                ('last_account_id', models.BigIntegerField(default=0)),
+                ('accounts', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='archivedtransaction',
+            name='transaction_type',
+            field=models.IntegerField(choices=[(1, 'Deposite'), (2, 'Withdraw'), (3, 'Loan'), (4, 'Loan Paid'), (5, 'TRANSFER MONEY '), (6, 'Money Received'), (7, 'Interest')], null=True),
+        ),
+        migrations.AlterField(
+            model_name='dailyaccountsummary',
+            name='transaction_type',
+            field=models.IntegerField(choices=[(1, 'Deposite'), (2, 'Withdraw'), (3, 'Loan'), (4, 'Loan Paid'), (5, 'TRANSFER MONEY '), (6, 'Money Received'), (7, 'Interest')]),
+        ),
+        migrations.AlterField(
+            model_name='transactionmodel',
+            name='transaction_type',
+            field=models.IntegerField(choices=[(1, 'Deposite'), (2, 'Withdraw'), (3, 'Loan'), (4, 'Loan Paid'), (5, 'TRANSFER MONEY '), (6, 'Money Received'), (7, 'Interest')], null=True),
+        ),
+    ]
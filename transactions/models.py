@@ -1,24 +1,51 @@
+from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 from accounts.models import UserBankAccount
 
-from .constants import TRANSACTION_TYPE
+from .constants import (
+    LOAN_REQUESTED,
+    LOAN_STATUS,
+    TRANSACTION_BADGE_CLASSES,
+    TRANSACTION_TYPE,
+    TRANSACTION_TYPE_NAMES,
+)
 
 # Create your models here.
 
 
 class TransactionModel(models.Model):
     account = models.ForeignKey(
-        UserBankAccount, related_name="transactions", on_delete=models.CASCADE
+        UserBankAccount,
+        related_name="transactions",
+        on_delete=models.CASCADE,
+        # Covered by the composite indexes below, which all lead with account.
+        db_index=False,
     )
     transaction_type = models.IntegerField(choices=TRANSACTION_TYPE, null=True)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     balance_after_transaction = models.DecimalField(max_digits=12, decimal_places=2)
     timeStamp = models.DateTimeField(auto_now_add=True)
-    loan_approve = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["timeStamp"]
+        indexes = [
+            models.Index(
+                fields=["account", "timeStamp", "id"], name="txn_account_time_idx"
+            ),
+            # Bank-wide, newest-first listings such as the admin changelist.
+            models.Index(fields=["timeStamp", "id"], name="txn_time_idx"),
+        ]
+
+    # Looked up per report row, so they skip get_transaction_type_display().
+    @property
+    def type_name(self):
+        return TRANSACTION_TYPE_NAMES.get(self.transaction_type)
+
+    @property
+    def badge_class(self):
+        return TRANSACTION_BADGE_CLASSES.get(self.transaction_type, "")
 
     # def __str__(self):
     #     return (
@@ -28,3 +55,198 @@ class TransactionModel(models.Model):
     #         f"Balance After Transaction: {self.balance_after_transaction} | "
     #         f"Date: {self.timeStamp.strftime('%Y-%m-%d %H:%M:%S')}"
     #     )
+
+
+class ArchivedTransaction(models.Model):
+    """
+    A TransactionModel row moved out of the hot table by archive_transactions.
+
+    It keeps its id, and its columns line up with TransactionModel's so the
+    two tables can be read as one with a UNION; see transactions.archive.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    account = models.ForeignKey(
+        UserBankAccount,
+        related_name="archived_transactions",
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    transaction_type = models.IntegerField(choices=TRANSACTION_TYPE, null=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after_transaction = models.DecimalField(max_digits=12, decimal_places=2)
+    timeStamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["account", "timeStamp", "id"], name="archive_account_time_idx"
+            ),
+        ]
+
+
+class TransactionEvent(models.Model):
+    """
+    A ledger row as it was posted, appended in the posting's transaction.
+
+    The id is the event's sequence number; consumers tail the stream by id
+    range, see transactions.events. Events are never updated and outlive
+    their row's move to the archive.
+    """
+
+    transaction_id = models.BigIntegerField()
+    account = models.ForeignKey(
+        UserBankAccount, related_name="+", on_delete=models.CASCADE, db_index=False
+    )
+    transaction_type = models.IntegerField(choices=TRANSACTION_TYPE, null=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after_transaction = models.DecimalField(max_digits=12, decimal_places=2)
+    timeStamp = models.DateTimeField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Event {self.pk}: transaction {self.transaction_id}"
+
+
+class ConsumerOffset(models.Model):
+    """The last event sequence a consumer group has processed."""
+
+    group = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.group} at {self.position}"
+
+
+class Loan(models.Model):
+    account = models.ForeignKey(
+        UserBankAccount,
+        related_name="loans",
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.PositiveSmallIntegerField(
+        choices=LOAN_STATUS, default=LOAN_REQUESTED
+    )
+    requested_at = models.DateTimeField(default=timezone.now)
+    approved_at = models.DateTimeField(null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    # The ledger entries that moved the money in and out.
+    disbursement = models.OneToOneField(
+        TransactionModel,
+        related_name="+",
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+    )
+    repayment = models.OneToOneField(
+        TransactionModel,
+        related_name="+",
+        on_delete=models.RESTRICT,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["requested_at"]
+        indexes = [
+            models.Index(
+                fields=["account", "requested_at"], name="loan_account_time_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Loan {self.pk}: {self.amount} ({self.get_status_display()})"
+
+
+class BankReserve(models.Model):
+    slot = models.PositiveSmallIntegerField(primary_key=True)
+    total = models.DecimalField(default=0, max_digits=16, decimal_places=2)
+
+    def __str__(self):
+        return f"Reserve slot {self.slot}: {self.total}"
+
+
+class BalanceCheckpoint(models.Model):
+    """An account's balance after every ledger row stamped before ``as_of``."""
+
+    account = models.ForeignKey(
+        UserBankAccount,
+        related_name="balance_checkpoints",
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "as_of"], name="balance_checkpoint_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account} at {self.as_of}: {self.balance}"
+
+
+class DailyAccountSummary(models.Model):
+    account = models.ForeignKey(
+        UserBankAccount,
+        related_name="daily_summaries",
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    date = models.DateField()
+    transaction_type = models.IntegerField(choices=TRANSACTION_TYPE)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(default=0, max_digits=16, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["account", "date", "transaction_type"],
+                name="daily_summary_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account} {self.date} {self.get_transaction_type_display()}"
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    response_location = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="idempotency_key_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+
+class InterestRun(models.Model):
+    """One month's interest accrual and how far it got; see transactions.interest."""
+
+    # The first day of the month the interest is for.
+    period = models.DateField(unique=True)
+    annual_rate = models.DecimalField(max_digits=6, decimal_places=5)
+    # Accounts opened after the run started wait for the next one.
+    through_account_id = models.BigIntegerField()
+    last_account_id = models.BigIntegerField(default=0)
+    accounts = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(default=0, max_digits=16, decimal_places=2)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Interest for {self.period:%Y-%m}"
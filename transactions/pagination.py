@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .archive import combine
+
+
+def encode_cursor(transaction):
+    value = f"{transaction.timeStamp.isoformat()}|{transaction.pk}"
+    return urlsafe_base64_encode(value.encode())
+
+
+def decode_cursor(cursor):
+    """Return ``(timeStamp, id)`` for a cursor, or raise ValueError."""
+    try:
+        timestamp, pk = force_str(urlsafe_base64_decode(cursor)).split("|")
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _page_query(queryset, page_size, after, before):
+    parts = queryset if isinstance(queryset, list) else [queryset]
+    ordering = ["timeStamp", "id"]
+    if before:
+        timestamp, pk = decode_cursor(before)
+        condition = Q(timeStamp__lt=timestamp) | Q(timeStamp=timestamp, id__lt=pk)
+        ordering = ["-timeStamp", "-id"]
+    elif after:
+        timestamp, pk = decode_cursor(after)
+        condition = Q(timeStamp__gt=timestamp) | Q(timeStamp=timestamp, id__gt=pk)
+    if before or after:
+        # Filter each part before the UNION so each one seeks its own index.
+        parts = [part.filter(condition) for part in parts]
+    return combine(parts).order_by(*ordering)[: page_size + 1]
+
+
+def _build_page(rows, page_size, after, before):
+    if before:
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after is not None
+
+    if not rows:
+        return KeysetPage(rows)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1]) if has_next else None,
+        previous_cursor=encode_cursor(rows[0]) if has_previous else None,
+    )
+
+
+def keyset_paginate(queryset, page_size, after=None, before=None):
+    """
+    Return one page of ``queryset`` ordered by ``(timeStamp, id)``.
+
+    ``after`` and ``before`` are cursors taken from a neighbouring page. Each
+    page is a single indexed range read no matter how deep into the history
+    it is, unlike OFFSET pagination. ``queryset`` may also be a list of
+    querysets with the same columns, such as ledger_parts(), read as one.
+    """
+    rows = list(_page_query(queryset, page_size, after, before))
+    return _build_page(rows, page_size, after, before)
+
+
+async def akeyset_paginate(queryset, page_size, after=None, before=None):
+    rows = [row async for row in _page_query(queryset, page_size, after, before)]
+    return _build_page(rows, page_size, after, before)
@@ -0,0 +1,475 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.utils import timezone
+
+from accounts.models import BalanceShard, UserBankAccount
+from accounts.snapshots import invalidate_account_snapshots
+
+from .constants import (
+    DEBIT_TYPES,
+    DEPOSIT,
+    LOAN,
+    LOAN_APPROVED,
+    LOAN_PAID,
+    LOAN_REPAID,
+    LOAN_REQUESTED,
+    MAX_ACTIVE_LOANS,
+    RESERVE_SLOTS,
+    TRANSFER_MONEY,
+    TRANSFER_RECEIVED,
+    WITHDRAW,
+)
+from .events import append_events
+from .models import BankReserve, Loan, TransactionModel
+from .summaries import record_daily_summary
+
+
+class PostingError(Exception):
+    pass
+
+
+class InsufficientBalance(PostingError):
+    pass
+
+
+class LoanLimitReached(PostingError):
+    pass
+
+
+def apply_balance_deltas(deltas, shard_counts=None):
+    """
+    Apply ``{account_id: delta}`` to the account balances with F() updates.
+
+    Rows are updated in ascending account id order, so two postings touching
+    the same accounts always lock them in the same order and cannot deadlock.
+    Debits only apply while the balance still covers them. Accounts listed in
+    ``shard_counts`` (``{account_id: shard_count}``) are hot accounts, posted
+    through their balance shards. Must be called inside a transaction;
+    returns the new balances keyed by account id.
+    """
+    shard_counts = shard_counts or {}
+    returning = _can_update_returning()
+    balances, user_ids, reread = {}, [], []
+    for account_id in sorted(deltas):
+        delta = deltas[account_id]
+        if shard_counts.get(account_id):
+            user_id, balance = _apply_sharded_delta(
+                account_id, delta, shard_counts[account_id]
+            )
+        elif returning:
+            user_id, balance = _update_balance_returning(account_id, delta)
+        else:
+            _update_balance(account_id, delta)
+            reread.append(account_id)
+            continue
+        balances[account_id] = balance
+        user_ids.append(user_id)
+
+    if reread:
+        rows = UserBankAccount.objects.filter(pk__in=reread).values_list(
+            "pk", "user_id", "balance"
+        )
+        for account_id, user_id, balance in rows:
+            balances[account_id] = balance
+            user_ids.append(user_id)
+    invalidate_account_snapshots(user_ids)
+    return balances
+
+
+def shard_counts_of(accounts):
+    """The ``shard_counts`` argument of apply_balance_deltas for ``accounts``."""
+    return {
+        account.pk: account.shard_count for account in accounts if account.shard_count
+    }
+
+
+def _update_balance(account_id, delta):
+    queryset = UserBankAccount.objects.filter(pk=account_id)
+    if delta < 0:
+        queryset = queryset.filter(balance__gte=-delta)
+    if not queryset.update(balance=F("balance") + delta):
+        raise InsufficientBalance("Insufficient Balance")
+
+
+def _can_update_returning():
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _update_balance_returning(account_id, delta):
+    # The same guarded update, but it hands back the balance it wrote, so the
+    # caller sees exactly its own posting and no re-read is needed.
+    opts = UserBankAccount._meta
+    qn = connection.ops.quote_name
+    field = opts.get_field("balance")
+    col = field.get_col(opts.db_table)
+    converters = connection.ops.get_db_converters(col) + field.get_db_converters(
+        connection
+    )
+    sql = (
+        f"UPDATE {qn(opts.db_table)} SET {qn(field.column)} = {qn(field.column)} + %s"
+        f" WHERE {qn(opts.pk.column)} = %s"
+    )
+    params = [delta, account_id]
+    if delta < 0:
+        sql += f" AND {qn(field.column)} >= %s"
+        params.append(-delta)
+    sql += f" RETURNING {qn(opts.get_field('user').column)}, {qn(field.column)}"
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        raise InsufficientBalance("Insufficient Balance")
+    user_id, balance = row
+    for converter in converters:
+        balance = converter(balance, col, connection)
+    return user_id, balance
+
+
+def _apply_sharded_delta(account_id, delta, shard_count):
+    # Credits only touch one randomly picked shard row, so concurrent credits
+    # to a hot account spread over shard_count row locks instead of queuing
+    # on the account row. Debits need the whole balance: they lock the
+    # account, fold the shards into it and then check and apply the debit.
+    if delta < 0:
+        user_id, balance = fold_balance_shards(account_id)
+        if balance < -delta:
+            raise InsufficientBalance("Insufficient Balance")
+        balance += delta
+        UserBankAccount.objects.filter(pk=account_id).update(balance=balance)
+        return user_id, balance
+
+    slot = random.randrange(shard_count)
+    shard = BalanceShard.objects.filter(account_id=account_id, slot=slot)
+    if not shard.update(amount=F("amount") + delta):
+        BalanceShard.objects.get_or_create(account_id=account_id, slot=slot)
+        shard.update(amount=F("amount") + delta)
+    # Without the account lock this total can miss credits other workers
+    # have not committed yet, so it is only as exact as a snapshot read.
+    user_id, balance, shards = (
+        UserBankAccount.objects.filter(pk=account_id)
+        .values_list("user_id", "balance")
+        .annotate(shards=Sum("balance_shards__amount"))
+        .get()
+    )
+    return user_id, balance + (shards or 0)
+
+
+def fold_balance_shards(account_id):
+    """
+    Move a hot account's shard amounts into its balance.
+
+    Locks the account row, then its shards, which is the order every sharded
+    debit takes them in. Must be called inside a transaction; returns the
+    account's user id and new balance.
+    """
+    user_id, balance = (
+        UserBankAccount.objects.select_for_update()
+        .filter(pk=account_id)
+        .values_list("user_id", "balance")
+        .get()
+    )
+    shards = list(
+        BalanceShard.objects.select_for_update()
+        .filter(account_id=account_id)
+        .exclude(amount=0)
+        .order_by("slot")
+        .values_list("pk", "amount")
+    )
+    if shards:
+        balance += sum(amount for _, amount in shards)
+        UserBankAccount.objects.filter(pk=account_id).update(balance=balance)
+        BalanceShard.objects.filter(pk__in=[pk for pk, _ in shards]).update(amount=0)
+    return user_id, balance
+
+
+def compact_balance_shards():
+    """
+    Fold the shards of every account that has any into its balance.
+
+    Each account is compacted in its own short transaction, so credits to
+    the others keep flowing. Totals never change, so neither does the
+    reserve. Returns the number of accounts compacted.
+    """
+    account_ids = (
+        BalanceShard.objects.exclude(amount=0)
+        .order_by("account_id")
+        .values_list("account_id", flat=True)
+        .distinct()
+    )
+    compacted = 0
+    for account_id in account_ids:
+        with transaction.atomic():
+            user_id, _ = fold_balance_shards(account_id)
+            invalidate_account_snapshots([user_id])
+        compacted += 1
+    return compacted
+
+
+@transaction.atomic
+def set_balance_shards(account, shard_count):
+    """Make ``account`` a hot account with ``shard_count`` shards, or 0 for none."""
+    _, account.balance = fold_balance_shards(account.pk)
+    UserBankAccount.objects.filter(pk=account.pk).update(shard_count=shard_count)
+    BalanceShard.objects.filter(account=account, slot__gte=shard_count).delete()
+    BalanceShard.objects.bulk_create(
+        [BalanceShard(account=account, slot=slot) for slot in range(shard_count)],
+        ignore_conflicts=True,
+    )
+    account.shard_count = shard_count
+    invalidate_account_snapshots([account.user_id])
+    return account
+
+
+def lock_accounts(account_ids):
+    """Lock the accounts in ascending id order, as apply_balance_deltas does."""
+    list(
+        UserBankAccount.objects.select_for_update()
+        .filter(pk__in=account_ids)
+        .order_by("pk")
+        .values_list("pk")
+    )
+
+
+def credit_accounts(credits):
+    """
+    Add ``{account_id: amount}`` to many balances with a single CASE update.
+
+    Lock the rows with lock_accounts first; returns the new balances keyed by
+    account id, shards included.
+    """
+    UserBankAccount.objects.filter(pk__in=credits).update(
+        balance=F("balance")
+        + Case(
+            *[When(pk=pk, then=Value(amount)) for pk, amount in credits.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+    rows = (
+        UserBankAccount.objects.filter(pk__in=credits)
+        .values_list("pk", "user_id", "balance")
+        .annotate(shards=Sum("balance_shards__amount"))
+    )
+    invalidate_account_snapshots(user_id for _, user_id, _, _ in rows)
+    return {
+        account_id: balance + (shards or 0) for account_id, _, balance, shards in rows
+    }
+
+
+def adjust_reserve(delta):
+    """
+    Add ``delta`` to the bank-wide reserve (the sum of all account balances).
+
+    Call it in the same transaction as the balance change it mirrors.
+    """
+    if not delta:
+        return
+    slot = random.randrange(RESERVE_SLOTS)
+    reserve = BankReserve.objects.filter(slot=slot)
+    if not reserve.update(total=F("total") + delta):
+        BankReserve.objects.get_or_create(slot=slot)
+        reserve.update(total=F("total") + delta)
+
+
+def bank_reserve_total():
+    return BankReserve.objects.aggregate(total=Sum("total"))["total"] or 0
+
+
+@transaction.atomic
+def rebuild_bank_reserve():
+    """Recompute the reserve from the account balances and return it."""
+    # Lock the reserve first: postings change balances before the reserve,
+    # so any posting still in flight will apply its delta after we commit.
+    list(BankReserve.objects.select_for_update())
+    total = UserBankAccount.objects.aggregate(total=Sum("balance"))["total"] or 0
+    total += BalanceShard.objects.aggregate(total=Sum("amount"))["total"] or 0
+    BankReserve.objects.update_or_create(slot=0, defaults={"total": total})
+    BankReserve.objects.filter(slot__gt=0).update(total=0)
+    BankReserve.objects.bulk_create(
+        [BankReserve(slot=slot) for slot in range(1, RESERVE_SLOTS)],
+        ignore_conflicts=True,
+    )
+    return total
+
+
+def _post(account, transaction_type, amount, delta):
+    row = TransactionModel(
+        account=account, transaction_type=transaction_type, amount=amount
+    )
+    return _post_row(row, delta)
+
+
+def _post_row(row, delta):
+    balances = apply_balance_deltas(
+        {row.account_id: delta}, shard_counts_of([row.account])
+    )
+    adjust_reserve(delta)
+    row.account.balance = balances[row.account_id]
+    row.balance_after_transaction = row.account.balance
+    row.save()
+    record_daily_summary([row])
+    append_events([row])
+    return row
+
+
+@transaction.atomic
+def post_entry(row):
+    """
+    Post an unsaved ledger row built elsewhere, such as the admin.
+
+    Debit types take the amount out of the account, everything else pays it
+    in; the balance moves by an F() update, never a read-modify-write.
+    """
+    delta = -row.amount if row.transaction_type in DEBIT_TYPES else row.amount
+    return _post_row(row, delta)
+
+
+@transaction.atomic
+def post_deposit(account, amount):
+    return _post(account, DEPOSIT, amount, amount)
+
+
+@transaction.atomic
+def post_withdrawal(account, amount):
+    return _post(account, WITHDRAW, amount, -amount)
+
+
+@transaction.atomic
+def post_transfer(sender, receiver, amount):
+    if sender.pk == receiver.pk:
+        raise PostingError("Cannot transfer money to your own account")
+
+    # Money only moves between accounts, so the reserve is unchanged.
+    balances = apply_balance_deltas(
+        {sender.pk: -amount, receiver.pk: amount},
+        shard_counts_of([sender, receiver]),
+    )
+    sender.balance = balances[sender.pk]
+    receiver.balance = balances[receiver.pk]
+
+    debit, credit = TransactionModel.objects.bulk_create(
+        [
+            TransactionModel(
+                account=sender,
+                transaction_type=TRANSFER_MONEY,
+                amount=amount,
+                balance_after_transaction=sender.balance,
+            ),
+            TransactionModel(
+                account=receiver,
+                transaction_type=TRANSFER_RECEIVED,
+                amount=amount,
+                balance_after_transaction=receiver.balance,
+            ),
+        ]
+    )
+    record_daily_summary([debit, credit])
+    append_events([debit, credit])
+    return debit, credit
+
+
+def _change_active_loans(account, delta):
+    queryset = UserBankAccount.objects.filter(pk=account.pk)
+    if delta > 0:
+        queryset = queryset.filter(active_loans__lte=MAX_ACTIVE_LOANS - delta)
+    if not queryset.update(active_loans=F("active_loans") + delta):
+        raise LoanLimitReached(f"You have already requested {MAX_ACTIVE_LOANS} loans.")
+    invalidate_account_snapshots([account.user_id])
+
+
+@transaction.atomic
+def request_loan(account, amount):
+    # The counter is claimed with a conditional update, so two concurrent
+    # requests cannot both take the last free slot.
+    _change_active_loans(account, 1)
+    return Loan.objects.create(account=account, amount=amount)
+
+
+@transaction.atomic
+def approve_loan(loan):
+    now = timezone.now()
+    claimed = Loan.objects.filter(pk=loan.pk, status=LOAN_REQUESTED).update(
+        status=LOAN_APPROVED, approved_at=now
+    )
+    if not claimed:
+        raise PostingError("This loan is not awaiting approval")
+
+    loan.status, loan.approved_at = LOAN_APPROVED, now
+    loan.disbursement = _post(loan.account, LOAN, loan.amount, loan.amount)
+    loan.save(update_fields=["disbursement"])
+    return loan
+
+
+@transaction.atomic
+def approve_loans(loans):
+    """
+    Approve every requested loan in the ``loans`` queryset at once.
+
+    The query count does not grow with the selection: one CASE update credits
+    every account and the disbursements are bulk inserted. Returns the loans
+    that were approved.
+    """
+    loans = list(
+        loans.select_related(None)
+        .select_for_update()
+        .filter(status=LOAN_REQUESTED)
+        .order_by("pk")
+    )
+    if not loans:
+        return []
+
+    credits = defaultdict(Decimal)
+    for loan in loans:
+        credits[loan.account_id] += loan.amount
+    lock_accounts(credits)
+    balances = credit_accounts(credits)
+    adjust_reserve(sum(credits.values()))
+
+    # Rebuild the running balance each disbursement leaves behind.
+    running = {pk: balances[pk] - credits[pk] for pk in credits}
+    disbursements = []
+    for loan in loans:
+        running[loan.account_id] += loan.amount
+        disbursements.append(
+            TransactionModel(
+                account_id=loan.account_id,
+                transaction_type=LOAN,
+                amount=loan.amount,
+                balance_after_transaction=running[loan.account_id],
+            )
+        )
+    TransactionModel.objects.bulk_create(disbursements)
+    record_daily_summary(disbursements)
+    append_events(disbursements)
+
+    now = timezone.now()
+    for loan, disbursement in zip(loans, disbursements):
+        loan.status, loan.approved_at = LOAN_APPROVED, now
+        loan.disbursement = disbursement
+    Loan.objects.bulk_update(loans, ["status", "approved_at", "disbursement"])
+    return loans
+
+
+@transaction.atomic
+def post_loan_payment(loan):
+    # Claiming the loan first makes a double-submitted payment a no-op.
+    now = timezone.now()
+    claimed = Loan.objects.filter(pk=loan.pk, status=LOAN_APPROVED).update(
+        status=LOAN_REPAID, paid_at=now
+    )
+    if not claimed:
+        raise PostingError("This loan is not payable")
+
+    loan.status, loan.paid_at = LOAN_REPAID, now
+    loan.repayment = _post(loan.account, LOAN_PAID, loan.amount, -loan.amount)
+    loan.save(update_fields=["repayment"])
+    _change_active_loans(loan.account, -1)
+    return loan
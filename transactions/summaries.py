@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import ledger_parts
+from .models import DailyAccountSummary
+
+# Above this many buckets, one set-based pass beats an UPDATE per bucket.
+SET_BASED_THRESHOLD = 4
+
+
+def record_daily_summary(transactions, sign=1):
+    """
+    Fold ledger rows into the daily per-account summary.
+
+    Call it in the same transaction that wrote the rows; ``sign=-1`` takes
+    rows back out, e.g. when a row changes type.
+    """
+    buckets = defaultdict(lambda: [0, 0])
+    for row in transactions:
+        key = (row.account_id, timezone.localdate(row.timeStamp), row.transaction_type)
+        buckets[key][0] += sign
+        buckets[key][1] += sign * row.amount
+
+    if len(buckets) > SET_BASED_THRESHOLD:
+        _apply_buckets_in_bulk(buckets)
+        return
+
+    for (account_id, date, transaction_type), (count, total) in sorted(buckets.items()):
+        summary = DailyAccountSummary.objects.filter(
+            account_id=account_id, date=date, transaction_type=transaction_type
+        )
+        changes = {"count": F("count") + count, "total": F("total") + total}
+        if not summary.update(**changes):
+            DailyAccountSummary.objects.get_or_create(
+                account_id=account_id, date=date, transaction_type=transaction_type
+            )
+            summary.update(**changes)
+
+
+def _apply_buckets_in_bulk(buckets):
+    # Make sure every row exists, lock them all in id order, then write the
+    # new totals back in one statement: three queries however many buckets.
+    DailyAccountSummary.objects.bulk_create(
+        [
+            DailyAccountSummary(
+                account_id=account_id, date=date, transaction_type=transaction_type
+            )
+            for account_id, date, transaction_type in buckets
+        ],
+        ignore_conflicts=True,
+    )
+    candidates = DailyAccountSummary.objects.select_for_update().filter(
+        account_id__in={key[0] for key in buckets},
+        date__in={key[1] for key in buckets},
+        transaction_type__in={key[2] for key in buckets},
+    )
+    summaries = []
+    for summary in candidates.order_by("pk"):
+        key = (summary.account_id, summary.date, summary.transaction_type)
+        if key in buckets:
+            count, total = buckets[key]
+            summary.count += count
+            summary.total += total
+            summaries.append(summary)
+    DailyAccountSummary.objects.bulk_update(summaries, ["count", "total"])
+
+
+def _range_totals(account, start_date, end_date):
+    return (
+        DailyAccountSummary.objects.filter(
+            account=account, date__gte=start_date, date__lte=end_date
+        )
+        .values_list("transaction_type")
+        .annotate(count=Sum("count"), total=Sum("total"))
+        .order_by("transaction_type")
+    )
+
+
+def summarize_range(account, start_date, end_date):
+    """Return ``{transaction_type: {"count": n, "total": amount}}``."""
+    return {
+        transaction_type: {"count": count, "total": total}
+        for transaction_type, count, total in _range_totals(
+            account, start_date, end_date
+        )
+    }
+
+
+async def asummarize_range(account, start_date, end_date):
+    return {
+        transaction_type: {"count": count, "total": total}
+        async for transaction_type, count, total in _range_totals(
+            account, start_date, end_date
+        )
+    }
+
+
+@transaction.atomic
+def rebuild_daily_summaries(batch_size=1000):
+    """Rebuild the whole summary table from the ledger and return its size."""
+    DailyAccountSummary.objects.all().delete()
+    hot, archived = (
+        part.filter(transaction_type__isnull=False)
+        .annotate(date=TruncDate("timeStamp"))
+        .values_list("account_id", "date", "transaction_type")
+        .annotate(count=Count("id"), total=Sum("amount"))
+        .order_by()
+        for part in ledger_parts()
+    )
+    # A day can have rows in both tables (loan entries are never archived),
+    # so the archive's buckets are merged into the hot table's ones.
+    pending = {
+        (account_id, date, transaction_type): (count, total)
+        for account_id, date, transaction_type, count, total in archived.iterator()
+    }
+
+    def merged():
+        for *key, count, total in hot.iterator(chunk_size=batch_size):
+            archived_count, archived_total = pending.pop(tuple(key), (0, 0))
+            yield *key, count + archived_count, total + archived_total
+        for key, (count, total) in pending.items():
+            yield *key, count, total
+
+    batch, created = [], 0
+    for account_id, date, transaction_type, count, total in merged():
+        batch.append(
+            DailyAccountSummary(
+                account_id=account_id,
+                date=date,
+                transaction_type=transaction_type,
+                count=count,
+                total=total,
+            )
+        )
+        if len(batch) == batch_size:
+            created += len(DailyAccountSummary.objects.bulk_create(batch))
+            batch = []
+    created += len(DailyAccountSummary.objects.bulk_create(batch))
+    return created
@@ -0,0 +1,14 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def money(value):
+    """
+    Format an amount like ``floatformat:2|intcomma`` in one step, e.g.
+    ``1,234.50``.
+    """
+    if value is None:
+        return ""
+    return f"{value:,.2f}"
@@ -1,3 +1,1644 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import SkipTest, mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserBankAccount
+from accounts.onboarding import reserve_account_numbers
+from core.models import OutboxEmail
+from core.outbox import dispatch_outbox
+
+from .admin import TransactionAdmin
+from .benchmarks import (
+    benchmark_interest,
+    benchmark_views,
+    format_results,
+    seed_bank,
+)
+from .archive import archive_transactions
+from .bulk import parse_transfer_rows, post_bulk_transfer
+from .checkpoints import balance_on, start_of_day, take_balance_checkpoints
+from .constants import (
+    DEPOSIT,
+    INTEREST,
+    LOAN,
+    LOAN_APPROVED,
+    LOAN_PAID,
+    LOAN_REPAID,
+    LOAN_REQUESTED,
+    TRANSFER_MONEY,
+    TRANSFER_RECEIVED,
+    WITHDRAW,
+)
+from .events import commit_offset, consumer_offset, read_events
+from .forms import DepositForm
+from .interest import accrue_interest, monthly_interest, previous_period
+from .models import (
+    ArchivedTransaction,
+    ConsumerOffset,
+    DailyAccountSummary,
+    IdempotencyKey,
+    InterestRun,
+    Loan,
+    TransactionEvent,
+    TransactionModel,
+)
+from .services import (
+    InsufficientBalance,
+    LoanLimitReached,
+    PostingError,
+    approve_loan,
+    approve_loans,
+    bank_reserve_total,
+    compact_balance_shards,
+    credit_accounts,
+    post_deposit,
+    post_loan_payment,
+    post_transfer,
+    post_withdrawal,
+    rebuild_bank_reserve,
+    request_loan,
+    set_balance_shards,
+)
+from .reconcile import reconcile
+from .summaries import rebuild_daily_summaries, summarize_range
+from .views import (
+    TransactionExportView,
+    TransactionReportView,
+    day_range_bounds,
+)
+
+
+def create_account(username, balance=0, account_number=None):
+    user = User.objects.create_user(
+        username=username, password="pass", email=f"{username}@example.com"
+    )
+    return UserBankAccount.objects.create(
+        user=user,
+        account_type="Savings",
+        account_number=account_number or reserve_account_numbers()[0],
+        gender="Male",
+        balance=balance,
+    )
+
+
+class PostTransferTests(TestCase):
+    def setUp(self):
+        self.sender = create_account("sender", balance=500)
+        self.receiver = create_account("receiver", balance=100)
+
+    def test_moves_balance_and_writes_both_legs(self):
+        debit, credit = post_transfer(self.sender, self.receiver, Decimal("200"))
+
+        self.sender.refresh_from_db()
+        self.receiver.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal("300"))
+        self.assertEqual(self.receiver.balance, Decimal("300"))
+        self.assertEqual(debit.transaction_type, TRANSFER_MONEY)
+        self.assertEqual(debit.balance_after_transaction, Decimal("300"))
+        self.assertEqual(credit.transaction_type, TRANSFER_RECEIVED)
+        self.assertEqual(credit.account, self.receiver)
+        self.assertEqual(TransactionModel.objects.count(), 2)
+
+    def test_uses_current_balance_not_stale_instance(self):
+        UserBankAccount.objects.filter(pk=self.sender.pk).update(balance=50)
+
+        with self.assertRaises(InsufficientBalance):
+            post_transfer(self.sender, self.receiver, Decimal("200"))
+
+        self.receiver.refresh_from_db()
+        self.assertEqual(self.receiver.balance, Decimal("100"))
+        self.assertFalse(TransactionModel.objects.exists())
+
+    def test_rejects_transfer_to_self(self):
+        with self.assertRaises(PostingError):
+            post_transfer(self.sender, self.sender, Decimal("10"))
+
+
+class TransferMoneyViewTests(TestCase):
+    def setUp(self):
+        self.sender = create_account("sender", balance=500)
+        self.receiver = create_account("receiver", balance=0)
+        self.client.login(username="sender", password="pass")
+
+    def test_transfer(self):
+        response = self.client.post(
+            reverse("transfer"),
+            {
+                "account_number": self.receiver.account_number,
+                "amount": "150",
+                "transaction_type": TRANSFER_MONEY,
+            },
+        )
+
+        self.assertRedirects(response, reverse("transaction_report"))
+        self.receiver.refresh_from_db()
+        self.assertEqual(self.receiver.balance, Decimal("150"))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(dispatch_outbox(), (2, 0))
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            ["receiver@example.com", "sender@example.com"],
+        )
+
+    def test_unknown_account(self):
+        response = self.client.post(
+            reverse("transfer"),
+            {"account_number": 1, "amount": "150", "transaction_type": TRANSFER_MONEY},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(TransactionModel.objects.exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+
+
+class BankReserveTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=300)
+        rebuild_bank_reserve()
+
+    def test_postings_keep_reserve_in_sync(self):
+        other = create_account("other")
+        post_deposit(self.account, Decimal("200"))
+        post_withdrawal(self.account, Decimal("50"))
+        post_transfer(self.account, other, Decimal("100"))
+
+        self.assertEqual(bank_reserve_total(), Decimal("450"))
+
+    def test_rebuild_command(self):
+        UserBankAccount.objects.filter(pk=self.account.pk).update(balance=1000)
+
+        out = StringIO()
+        call_command("rebuild_bank_reserve", stdout=out)
+
+        self.assertEqual(bank_reserve_total(), Decimal("1000"))
+        self.assertIn("Bank reserve rebuilt: 1000", out.getvalue())
+
+    def test_withdraw_checks_reserve(self):
+        self.client.login(username="customer", password="pass")
+        UserBankAccount.objects.filter(pk=self.account.pk).update(balance=10000)
+
+        response = self.client.post(
+            reverse("withdraw"), {"amount": "5000", "transaction_type": WITHDRAW}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Bank is Bankrupt")
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("10000"))
+
+
+class HotAccountTests(TestCase):
+    def setUp(self):
+        self.merchant = set_balance_shards(create_account("merchant", 100), 4)
+        self.customer = create_account("customer", balance=500)
+        rebuild_bank_reserve()
+
+    def test_credits_land_on_shards(self):
+        post_transfer(self.customer, self.merchant, Decimal("30"))
+        credit = post_deposit(self.merchant, Decimal("20"))
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, Decimal("100"))
+        self.assertEqual(self.merchant.current_balance, Decimal("150"))
+        self.assertEqual(credit.balance_after_transaction, Decimal("150"))
+        self.assertEqual(bank_reserve_total(), Decimal("620"))
+        self.assertEqual(rebuild_bank_reserve(), Decimal("620"))
+
+    def test_debit_folds_shards(self):
+        post_deposit(self.merchant, Decimal("50"))
+
+        debit, _ = post_transfer(self.merchant, self.customer, Decimal("120"))
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, Decimal("30"))
+        self.assertEqual(self.merchant.current_balance, Decimal("30"))
+        self.assertEqual(debit.balance_after_transaction, Decimal("30"))
+        with self.assertRaises(InsufficientBalance):
+            post_withdrawal(self.merchant, Decimal("31"))
+
+    def test_batch_credits_count_the_shards(self):
+        post_deposit(self.merchant, Decimal("20"))
+        Loan.objects.create(account=self.merchant, amount=Decimal("50"))
+
+        (loan,) = approve_loans(Loan.objects.all())
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.current_balance, Decimal("170"))
+        self.assertEqual(loan.disbursement.balance_after_transaction, Decimal("170"))
+
+    def test_compact_command(self):
+        post_deposit(self.merchant, Decimal("25"))
+        post_deposit(self.customer, Decimal("25"))
+
+        out = StringIO()
+        call_command("compact_balance_shards", stdout=out)
+
+        self.assertIn("Compacted 1 accounts", out.getvalue())
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, Decimal("125"))
+        self.assertFalse(self.merchant.balance_shards.exclude(amount=0).exists())
+
+    def test_turning_sharding_off_keeps_the_balance(self):
+        post_deposit(self.merchant, Decimal("25"))
+
+        out = StringIO()
+        call_command("set_balance_shards", self.merchant.account_number, 0, stdout=out)
+
+        self.assertIn("now has 0 balance shards", out.getvalue())
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.shard_count, 0)
+        self.assertEqual(self.merchant.balance, Decimal("125"))
+        self.assertFalse(self.merchant.balance_shards.exists())
+
+    def test_report_shows_current_balance(self):
+        post_deposit(self.merchant, Decimal("25"))
+        self.client.force_login(self.merchant.user)
+
+        response = self.client.get(reverse("transaction_report"))
+
+        self.assertInHTML(
+            '<th class="px-4 py-2 text-left">$ 125.00</th>', response.text, count=1
+        )
+
+
+class BalanceCheckpointTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=100)
+        self.day = timezone.localdate() - timedelta(days=5)
+        self.rows = [
+            self.post_on(0, post_deposit, Decimal("50")),
+            self.post_on(1, post_withdrawal, Decimal("30")),
+            self.post_on(2, post_deposit, Decimal("10")),
+        ]
+
+    def post_on(self, days, post, amount):
+        row = post(self.account, amount)
+        row.timeStamp = start_of_day(self.day + timedelta(days=days)) + timedelta(
+            hours=12
+        )
+        TransactionModel.objects.filter(pk=row.pk).update(timeStamp=row.timeStamp)
+        return row
+
+    def checkpoint(self, days):
+        return take_balance_checkpoints(start_of_day(self.day + timedelta(days=days)))
+
+    def test_balance_on_seeks_checkpoint(self):
+        self.assertEqual(self.checkpoint(1), (1, 0))
+        self.assertEqual(self.checkpoint(2), (1, 0))
+        self.assertEqual(self.checkpoint(2), (0, 0))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(balance_on(self.account, self.day), Decimal("150"))
+        self.assertEqual(
+            balance_on(self.account, self.day + timedelta(days=1)), Decimal("120")
+        )
+        self.assertEqual(
+            balance_on(self.account, self.day + timedelta(days=2)), Decimal("130")
+        )
+        self.assertEqual(
+            balance_on(self.account, self.day - timedelta(days=1)), Decimal("100")
+        )
+
+    def test_balance_on_without_checkpoints(self):
+        self.assertEqual(
+            balance_on(self.account, self.day + timedelta(days=1)), Decimal("120")
+        )
+
+    def test_checkpoints_repair_running_balances(self):
+        TransactionModel.objects.filter(pk=self.rows[0].pk).update(
+            balance_after_transaction=100
+        )
+        TransactionModel.objects.filter(pk=self.rows[2].pk).update(
+            balance_after_transaction=0
+        )
+
+        self.assertEqual(self.checkpoint(1), (1, 1))
+        self.assertEqual(self.checkpoint(3), (1, 1))
+
+        self.assertEqual(
+            list(
+                self.account.transactions.order_by("pk").values_list(
+                    "balance_after_transaction", flat=True
+                )
+            ),
+            [Decimal("150"), Decimal("120"), Decimal("130")],
+        )
+
+    def test_verify_command(self):
+        self.checkpoint(1)
+        self.checkpoint(3)
+        out = StringIO()
+        call_command("verify_balance_checkpoints", stdout=out)
+        self.assertIn("Checked 2 checkpoints", out.getvalue())
+
+        TransactionModel.objects.filter(pk=self.rows[1].pk).update(amount=40)
+
+        err = StringIO()
+        with self.assertRaisesMessage(CommandError, "mismatches: 1"):
+            call_command("verify_balance_checkpoints", stdout=StringIO(), stderr=err)
+        self.assertIn(f"account_id={self.account.pk}", err.getvalue())
+
+    def test_form_save_records_balance_after_posting(self):
+        form = DepositForm(
+            {"amount": "200"},
+            account=self.account,
+            initial={"transaction_type": DEPOSIT},
+        )
+
+        self.assertTrue(form.is_valid())
+        row = form.save()
+
+        self.assertEqual(row.balance_after_transaction, Decimal("330"))
+
+
+@override_settings(TRANSACTION_ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=0)
+        self.now = timezone.now()
+        self.post_at(60, post_deposit, Decimal("100"))
+        self.post_at(45, post_withdrawal, Decimal("30"))
+        loan = approve_loan(request_loan(self.account, Decimal("50")))
+        self.stamp(loan.disbursement, 40)
+        self.post_at(1, post_deposit, Decimal("5"))
+        rebuild_daily_summaries()
+
+    def stamp(self, row, days_ago):
+        row.timeStamp = self.now - timedelta(days=days_ago)
+        TransactionModel.objects.filter(pk=row.pk).update(timeStamp=row.timeStamp)
+
+    def post_at(self, days_ago, post, amount):
+        self.stamp(post(self.account, amount), days_ago)
+
+    def report(self, days_ago=None):
+        params = {}
+        if days_ago is not None:
+            params = {
+                "start_date": (self.now - timedelta(days=days_ago)).date(),
+                "end_date": self.now.date(),
+            }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("transaction_report"), params)
+        reads_archive = any(
+            ArchivedTransaction._meta.db_table in query["sql"]
+            for query in queries.captured_queries
+        )
+        return [row.amount for row in response.context["object_list"]], reads_archive
+
+    def test_moves_old_rows_but_keeps_loan_entries(self):
+        self.assertEqual(archive_transactions(batch_size=1), 2)
+
+        self.assertEqual(
+            list(ArchivedTransaction.objects.values_list("amount", flat=True)),
+            [Decimal("100"), Decimal("30")],
+        )
+        self.assertEqual(TransactionModel.objects.count(), 2)
+        self.assertEqual(archive_transactions(), 0)
+
+    def test_never_archives_past_the_horizon(self):
+        self.assertEqual(archive_transactions(before=self.now), 2)
+        self.assertTrue(TransactionModel.objects.filter(amount=5).exists())
+
+    def test_report_reads_archive_only_when_range_needs_it(self):
+        archive_transactions()
+        self.client.force_login(self.account.user)
+
+        self.assertEqual(self.report(7), ([Decimal("5")], False))
+        self.assertEqual(
+            self.report(90),
+            ([Decimal("100"), Decimal("30"), Decimal("50"), Decimal("5")], True),
+        )
+        self.assertEqual(self.report()[0], self.report(90)[0])
+
+    def test_export_includes_archived_rows(self):
+        archive_transactions()
+        self.client.force_login(self.account.user)
+
+        response = self.client.get(reverse("transaction_export"), {"format": "jsonl"})
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["amount"] for line in lines],
+            ["100.00", "30.00", "50.00", "5.00"],
+        )
+
+    def test_history_survives_archival(self):
+        summaries = sorted(
+            DailyAccountSummary.objects.values_list("date", "count", "total")
+        )
+        day = (self.now - timedelta(days=50)).date()
+        self.assertEqual(balance_on(self.account, day), Decimal("100"))
+
+        archive_transactions()
+        rebuild_daily_summaries()
+
+        self.assertEqual(
+            sorted(DailyAccountSummary.objects.values_list("date", "count", "total")),
+            summaries,
+        )
+        self.assertEqual(balance_on(self.account, day), Decimal("100"))
+
+
+@override_settings(SAVINGS_INTEREST_RATE=Decimal("0.03"))
+class InterestTests(TestCase):
+    period = date(2026, 9, 1)
+
+    def setUp(self):
+        self.accounts = [
+            create_account(f"saver{i}", balance=1200 * (i + 1)) for i in range(3)
+        ]
+        self.current = create_account("current", balance=1200)
+        UserBankAccount.objects.filter(pk=self.current.pk).update(
+            account_type="Current"
+        )
+        self.empty = create_account("empty")
+        rebuild_bank_reserve()
+
+    def balances(self):
+        return list(
+            UserBankAccount.objects.order_by("pk").values_list("balance", flat=True)
+        )
+
+    def test_pays_savings_accounts(self):
+        run = accrue_interest(date(2026, 9, 17), chunk_size=2)
+
+        self.assertEqual(run.period, self.period)
+        self.assertIsNotNone(run.completed_at)
+        self.assertEqual((run.accounts, run.total), (3, Decimal("18")))
+        self.assertEqual(
+            self.balances(),
+            [Decimal("1203"), Decimal("2406"), Decimal("3609"), 1200, 0],
+        )
+        self.assertEqual(
+            list(
+                TransactionModel.objects.order_by("account_id").values_list(
+                    "transaction_type", "amount", "balance_after_transaction"
+                )
+            ),
+            [
+                (INTEREST, Decimal("3"), Decimal("1203")),
+                (INTEREST, Decimal("6"), Decimal("2406")),
+                (INTEREST, Decimal("9"), Decimal("3609")),
+            ],
+        )
+        self.assertEqual(bank_reserve_total(), rebuild_bank_reserve())
+        self.assertEqual(
+            DailyAccountSummary.objects.filter(transaction_type=INTEREST).count(), 3
+        )
+
+    def test_rounds_to_the_cent(self):
+        self.assertEqual(
+            monthly_interest(Decimal("2"), Decimal("0.03")), Decimal("0.01")
+        )
+        self.assertEqual(monthly_interest(Decimal("1"), Decimal("0.03")), 0)
+        self.assertEqual(
+            monthly_interest(Decimal("1234.56"), Decimal("0.0425")), Decimal("4.37")
+        )
+
+    def test_includes_shards(self):
+        merchant = set_balance_shards(self.accounts[0], 4)
+        post_deposit(merchant, Decimal("1200"))
+
+        accrue_interest(self.period)
+
+        merchant.refresh_from_db()
+        self.assertEqual(merchant.current_balance, Decimal("2406"))
+        self.assertEqual(
+            merchant.transactions.get(transaction_type=INTEREST).amount, Decimal("6")
+        )
+
+    def test_runs_once_per_period(self):
+        accrue_interest(self.period)
+
+        with self.assertNumQueries(1):
+            run = accrue_interest(self.period)
+
+        self.assertEqual(run.total, Decimal("18"))
+        self.assertEqual(TransactionModel.objects.count(), 3)
+        accrue_interest(date(2026, 8, 1))
+        self.assertEqual(TransactionModel.objects.count(), 6)
+        self.assertEqual(previous_period(date(2026, 1, 31)), date(2025, 12, 1))
+
+    def test_resumes_after_a_failed_chunk(self):
+        def credit_once(credits):
+            if credited:
+                raise RuntimeError("worker died")
+            credited.append(credits)
+            return credit_accounts(credits)
+
+        credited = []
+        with mock.patch("transactions.interest.credit_accounts", credit_once):
+            with self.assertRaises(RuntimeError):
+                accrue_interest(self.period, chunk_size=1)
+
+        run = InterestRun.objects.get()
+        self.assertEqual(run.last_account_id, self.accounts[0].pk)
+        self.assertIsNone(run.completed_at)
+
+        # A resumed run keeps the rate it started with.
+        with override_settings(SAVINGS_INTEREST_RATE=Decimal("0.06")):
+            run = accrue_interest(self.period, chunk_size=1)
+
+        self.assertEqual((run.accounts, run.total), (3, Decimal("18")))
+        self.assertEqual(TransactionModel.objects.count(), 3)
+
+    def test_rejects_a_month_that_has_not_ended(self):
+        this_month = timezone.localdate().replace(day=1)
+
+        with self.assertRaisesMessage(ValueError, "has not ended yet"):
+            accrue_interest(this_month)
+        with self.assertRaisesMessage(CommandError, "has not ended yet"):
+            call_command("accrue_interest", "--period", f"{this_month.year + 1}-01")
+        self.assertFalse(InterestRun.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command("accrue_interest", "--period", "2026-09", stdout=out)
+
+        self.assertIn("Interest for 2026-09: 18.00 paid to 3 accounts", out.getvalue())
+
+
+class TransactionEventTests(TestCase):
+    def setUp(self):
+        self.customer = create_account("customer", balance=100)
+        self.merchant = create_account("merchant")
+        post_deposit(self.customer, Decimal("50"))
+        post_transfer(self.customer, self.merchant, Decimal("30"))
+        approve_loan(request_loan(self.merchant, Decimal("1000")))
+        self.staff = User.objects.create_user("staff", password="pass", is_staff=True)
+
+    def test_postings_append_events_in_order(self):
+        with self.assertRaises(InsufficientBalance):
+            post_withdrawal(self.merchant, Decimal("5000"))
+
+        events = read_events()
+
+        self.assertEqual(
+            [event["sequence"] for event in events],
+            list(TransactionEvent.objects.order_by("pk").values_list("pk", flat=True)),
+        )
+        self.assertEqual(
+            [event["transaction_id"] for event in events],
+            list(TransactionModel.objects.order_by("pk").values_list("pk", flat=True)),
+        )
+        self.assertEqual(
+            [
+                (event["account_number"], event["transaction_type"], event["amount"])
+                for event in events
+            ],
+            [
+                (self.customer.account_number, "Deposite", "50.00"),
+                (self.customer.account_number, "TRANSFER MONEY ", "30.00"),
+                (self.merchant.account_number, "Money Received", "30.00"),
+                (self.merchant.account_number, "Loan", "1000.00"),
+            ],
+        )
+        self.assertEqual(events[1]["balance_after_transaction"], "120.00")
+
+    def test_reads_from_a_cursor(self):
+        first, second, *rest = read_events()
+
+        self.assertEqual(read_events(first["sequence"], limit=1), [second])
+        self.assertEqual(read_events(rest[-1]["sequence"]), [])
+
+    def test_waits_at_a_gap_until_it_settles(self):
+        first, second, *rest = TransactionEvent.objects.order_by("pk")
+        second.delete()
+
+        self.assertEqual([event["sequence"] for event in read_events()], [first.pk])
+        TransactionEvent.objects.filter(pk=rest[0].pk).update(
+            created_at=timezone.now() - settings.TRANSACTION_EVENT_SETTLE
+        )
+        self.assertEqual(
+            [event["sequence"] for event in read_events()],
+            [first.pk] + [event.pk for event in rest],
+        )
+
+    def test_offsets_only_move_forward(self):
+        self.assertEqual(consumer_offset("fraud"), 0)
+
+        commit_offset("fraud", 3)
+        commit_offset("fraud", 2)
+
+        self.assertEqual(consumer_offset("fraud"), 3)
+        self.assertEqual(ConsumerOffset.objects.count(), 1)
+
+    def test_command_tails_from_the_committed_offset(self):
+        out = StringIO()
+        call_command("consume_events", "fraud", "--batch-size", "3", stdout=out)
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(lines, read_events())
+        self.assertEqual(consumer_offset("fraud"), lines[-1]["sequence"])
+
+        post_deposit(self.merchant, Decimal("5"))
+        out = StringIO()
+        call_command("consume_events", "fraud", stdout=out)
+        (line,) = out.getvalue().splitlines()
+        self.assertEqual(json.loads(line)["amount"], "5.00")
+
+    def test_endpoint(self):
+        url = reverse("transaction_events")
+        self.client.force_login(self.customer.user)
+        self.assertEqual(self.client.get(url, {"after": 0}).status_code, 403)
+
+        self.client.force_login(self.staff)
+        with self.assertNumQueries(4):
+            page = self.client.get(url, {"group": "fraud", "limit": 2}).json()
+        self.assertEqual(page["events"], read_events(limit=2))
+        self.assertEqual(page["next"], page["events"][-1]["sequence"])
+
+        response = self.client.post(
+            url,
+            {"group": "fraud", "position": page["next"]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"group": "fraud", "position": page["next"]})
+        rest = self.client.get(url, {"group": "fraud"}).json()
+        self.assertEqual(rest["events"], read_events(page["next"]))
+        self.assertEqual(len(rest["events"]), 2)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class TransactionReportViewTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=0)
+        TransactionModel.objects.bulk_create(
+            TransactionModel(
+                account=self.account,
+                transaction_type=DEPOSIT,
+                amount=i + 1,
+                balance_after_transaction=0,
+            )
+            for i in range(60)
+        )
+        # Give every row the same timestamp so ordering falls back to the id.
+        TransactionModel.objects.update(timeStamp=timezone.now())
+        self.client.login(username="customer", password="pass")
+
+    def walk_pages(self):
+        url, seen = reverse("transaction_report"), []
+        while url:
+            response = self.client.get(url)
+            seen.extend(row.pk for row in response.context["object_list"])
+            next_page = response.context.get("next_page_url")
+            url = next_page and reverse("transaction_report") + next_page
+        return seen, response
+
+    def test_pages_cover_every_row_once_in_order(self):
+        seen, last_page = self.walk_pages()
+
+        expected = list(
+            TransactionModel.objects.order_by("id").values_list("pk", flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(last_page.context["object_list"]), 10)
+
+        previous = self.client.get(
+            reverse("transaction_report") + last_page.context["previous_page_url"]
+        )
+        self.assertEqual(
+            [row.pk for row in previous.context["object_list"]], expected[25:50]
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("transaction_report"), {"after": "garbage"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_dates(self):
+        response = self.client.get(
+            reverse("transaction_report"),
+            {"start_date": "2026-13-01", "end_date": "2026-10-01"},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    async def test_stream_renders_every_row(self):
+        await self.async_client.aforce_login(self.account.user)
+
+        with mock.patch.object(TransactionReportView, "stream_chunk_size", 7):
+            response = await self.async_client.get(
+                reverse("transaction_report"), {"stream": 1}
+            )
+            content = b"".join([c async for c in response.streaming_content]).decode()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(content.count('<tr class="border-b'), 60)
+        self.assertIn("Current Balance", content)
+
+    def test_sync_stream_reads_rows_as_it_sends_them(self):
+        with mock.patch.object(TransactionReportView, "stream_chunk_size", 7):
+            response = self.client.get(reverse("transaction_report"), {"stream": 1})
+            chunks = iter(response.streaming_content)
+            # The ledger is not queried before the page head has gone out.
+            with CaptureQueriesContext(connection) as queries:
+                head = next(chunks).decode()
+            rows = [chunk.decode() for chunk in chunks]
+
+        self.assertEqual(len(queries), 0)
+        self.assertNotIn('<tr class="border-b', head)
+        self.assertEqual(
+            [chunk.count('<tr class="border-b') for chunk in rows[:-1]],
+            [7] * 8 + [4],
+        )
+        self.assertIn("Current Balance", rows[-1])
+
+
+class ReportRenderingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account("customer", balance=100)
+        self.other = create_account("other")
+        self.client.login(username="customer", password="pass")
+
+    def test_badges_follow_debit_types(self):
+        post_deposit(self.account, Decimal("1234.5"))
+        post_transfer(self.account, self.other, Decimal("30"))
+
+        response = self.client.get(reverse("transaction_report"))
+
+        self.assertContains(
+            response,
+            '<span class="px-2 py-1 font-bold leading-tight rounded-sm '
+            'text-green-700 bg-green-100">\n        Deposite',
+        )
+        self.assertContains(
+            response,
+            '<span class="px-2 py-1 font-bold leading-tight rounded-sm '
+            'text-red-700 bg-red-100">\n        TRANSFER MONEY ',
+        )
+        self.assertContains(response, "$ 1,334.50")
+
+    def test_money_matches_floatformat_intcomma(self):
+        template = Template(
+            "{% load humanize money %}{{ value|floatformat:2|intcomma }} {{ value|money }}"
+        )
+        for value in [0, Decimal("7.5"), Decimal("-1234.56"), Decimal("1234567.89")]:
+            with self.subTest(value=value):
+                old, new = template.render(Context({"value": value})).split()
+                self.assertEqual(new, old)
+
+    @override_settings(REPORT_CACHE_TIMEOUT=60)
+    def test_cached_report_until_the_ledger_changes(self):
+        post_deposit(self.account, Decimal("20"))
+        url = reverse("transaction_report")
+        first = self.client.get(url)
+
+        # Session and user only.
+        with self.assertNumQueries(2):
+            cached = self.client.get(url)
+        self.assertEqual(cached.context["report_body"], first.context["report_body"])
+        self.assertNotEqual(
+            self.client.get(url, {"start_date": "2020-01-01"}).context["report_body"],
+            first.context["report_body"],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post_deposit(self.account, Decimal("7"))
+        self.assertContains(self.client.get(url), "$ 127.00")
+
+    @override_settings(REPORT_CACHE_TIMEOUT=60)
+    def test_checkpoint_repairs_refresh_cached_report(self):
+        row = post_deposit(self.account, Decimal("20"))
+        TransactionModel.objects.filter(pk=row.pk).update(
+            balance_after_transaction=Decimal("999"),
+            timeStamp=timezone.now() - timedelta(days=1),
+        )
+        url = reverse("transaction_report")
+        self.assertContains(self.client.get(url), "$ 999.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            take_balance_checkpoints()
+
+        response = self.client.get(url)
+        self.assertNotContains(response, "$ 999.00")
+        self.assertContains(response, "$ 120.00")
+
+
+class TransactionIndexTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer")
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == "postgresql":
+            # Tiny test tables are cheaper to scan; make the planner show
+            # whether the index is usable at all.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_report_range_uses_account_time_index(self):
+        start, end = day_range_bounds(date(2024, 1, 1), date(2024, 1, 31))
+        queryset = TransactionModel.objects.filter(
+            account=self.account, timeStamp__gte=start, timeStamp__lt=end
+        ).order_by("timeStamp", "id")
+
+        self.assertUsesIndex(queryset, "txn_account_time_idx")
+
+    def test_loan_list_uses_loan_index(self):
+        queryset = Loan.objects.filter(account=self.account)
+
+        self.assertUsesIndex(queryset, "loan_account_time_idx")
+
+
+class DailySummaryTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=1000)
+        self.other = create_account("other", balance=1000)
+
+    def snapshot(self):
+        return sorted(
+            DailyAccountSummary.objects.values_list(
+                "account_id", "date", "transaction_type", "count", "total"
+            )
+        )
+
+    def test_postings_update_summary(self):
+        post_deposit(self.account, Decimal("100"))
+        post_deposit(self.account, Decimal("50"))
+        post_transfer(self.account, self.other, Decimal("30"))
+
+        today = timezone.localdate()
+        totals = summarize_range(self.account, today, today)
+        self.assertEqual(totals[DEPOSIT], {"count": 2, "total": Decimal("150")})
+        self.assertEqual(totals[TRANSFER_MONEY], {"count": 1, "total": Decimal("30")})
+        self.assertEqual(
+            summarize_range(self.other, today, today),
+            {TRANSFER_RECEIVED: {"count": 1, "total": Decimal("30")}},
+        )
+
+    def test_rebuild_matches_incremental_summary(self):
+        post_deposit(self.account, Decimal("100"))
+        post_withdrawal(self.account, Decimal("20"))
+        post_transfer(self.other, self.account, Decimal("5"))
+        incremental = self.snapshot()
+
+        out = StringIO()
+        call_command("rebuild_daily_summaries", stdout=out)
+
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertIn(f"Rebuilt {len(incremental)} daily summaries", out.getvalue())
+
+    def test_report_range_only_counts_own_account(self):
+        post_deposit(self.account, Decimal("100"))
+        post_deposit(self.other, Decimal("700"))
+        self.client.login(username="customer", password="pass")
+        today = timezone.localdate().isoformat()
+
+        response = self.client.get(
+            reverse("transaction_report"), {"start_date": today, "end_date": today}
+        )
+
+        self.assertEqual(
+            response.context["type_totals"],
+            [("Deposite", {"count": 1, "total": Decimal("100")})],
+        )
+        self.assertEqual(len(response.context["object_list"]), 1)
+
+
+class TransactionExportViewTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer")
+        self.client.login(username="customer", password="pass")
+
+    def add_transactions(self, count):
+        TransactionModel.objects.bulk_create(
+            (
+                TransactionModel(
+                    account=self.account,
+                    transaction_type=DEPOSIT,
+                    amount=100,
+                    balance_after_transaction=100,
+                )
+                for _ in range(count)
+            ),
+            batch_size=1000,
+        )
+
+    def export(self, **params):
+        return self.client.get(reverse("transaction_export"), params)
+
+    def test_csv(self):
+        self.add_transactions(3)
+
+        response = self.export(format="csv")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ",".join(TransactionExportView.fields))
+        self.assertEqual(len(lines), 4)
+        self.assertIn(",Deposite,100.00,100.00", lines[1])
+
+    def test_jsonl_respects_date_range(self):
+        self.add_transactions(2)
+        TransactionModel.objects.filter(
+            pk=TransactionModel.objects.order_by("id").first().pk
+        ).update(timeStamp=timezone.now() - timedelta(days=10))
+        today = timezone.localdate().isoformat()
+
+        response = self.export(format="jsonl", start_date=today, end_date=today)
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["amount"], "100.00")
+
+    def test_rejects_unknown_format(self):
+        self.assertEqual(self.export(format="xml").status_code, 400)
+
+    def test_memory_stays_flat_as_rows_grow(self):
+        def peak_memory(count):
+            TransactionModel.objects.all().delete()
+            self.add_transactions(count)
+            tracemalloc.start()
+            response = self.export(format="csv")
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.assertGreater(size, count * 20)
+            return peak
+
+        small, large = peak_memory(2000), peak_memory(20000)
+
+        # Ten times the rows must not cost anywhere near ten times the memory.
+        self.assertLess(large, small * 2)
+
+
+class ViewBenchmarkTests(TestCase):
+    """
+    Query and latency budgets for the hot views on a synthetic bank.
+
+    Scale it up with BENCH_ACCOUNTS, BENCH_TRANSACTIONS and BENCH_RUNS; set
+    BENCH_REPORT=1 to print the measurements.
+    """
+
+    # view: (max queries, max p95 ms)
+    budgets = {
+        "deposit": (12, 250),
+        "withdraw": (10, 250),
+        "transfer": (15, 250),
+        "loan_request": (7, 250),
+        "transaction_report": (3, 500),
+        "transaction_report_range": (4, 500),
+        "all_loans": (3, 250),
+        "loan_pay": (13, 250),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.accounts = seed_bank(
+            accounts=int(os.environ.get("BENCH_ACCOUNTS", 50)),
+            transactions=int(os.environ.get("BENCH_TRANSACTIONS", 2000)),
+        )
+
+    def test_views_stay_within_budget(self):
+        results = benchmark_views(
+            self.client,
+            self.accounts[0],
+            self.accounts[1],
+            runs=int(os.environ.get("BENCH_RUNS", 10)),
+        )
+        if os.environ.get("BENCH_REPORT"):
+            print("\n" + format_results(results))
+
+        for view, (max_queries, max_p95) in self.budgets.items():
+            with self.subTest(view=view):
+                self.assertLessEqual(results[view]["queries"], max_queries)
+                self.assertLessEqual(results[view]["p95"], max_p95)
+
+
+class InterestBenchmarkTests(TestCase):
+    """
+    Accrual throughput on a synthetic bank; BENCH_ACCOUNTS scales it up and
+    BENCH_REPORT=1 prints the measurements.
+    """
+
+    max_queries_per_chunk = 16
+    min_accounts_per_second = 500
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bank(accounts=int(os.environ.get("BENCH_ACCOUNTS", 500)), transactions=0)
+
+    def test_accrual_throughput(self):
+        result = benchmark_interest(date(2026, 9, 1), chunk_size=100)
+        if os.environ.get("BENCH_REPORT"):
+            print(f"\ninterest accrual: {result}")
+
+        self.assertEqual(result["accounts"], UserBankAccount.objects.count())
+        self.assertLessEqual(result["queries_per_chunk"], self.max_queries_per_chunk)
+        self.assertGreaterEqual(
+            result["accounts_per_second"], self.min_accounts_per_second
+        )
+        self.assertEqual(bank_reserve_total(), rebuild_bank_reserve())
+
+
+class LoanTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=100)
+        rebuild_bank_reserve()
+
+    def test_request_claims_a_loan_slot(self):
+        loan = request_loan(self.account, Decimal("500"))
+
+        self.account.refresh_from_db()
+        self.assertEqual(loan.status, LOAN_REQUESTED)
+        self.assertEqual(self.account.active_loans, 1)
+        self.assertEqual(self.account.balance, Decimal("100"))
+        self.assertFalse(self.account.transactions.exists())
+
+    def test_limit_counts_unpaid_loans(self):
+        for _ in range(3):
+            request_loan(self.account, Decimal("10"))
+
+        with self.assertRaises(LoanLimitReached):
+            request_loan(self.account, Decimal("10"))
+        self.assertEqual(self.account.loans.count(), 3)
+
+    def test_approval_posts_disbursement(self):
+        loan = approve_loan(request_loan(self.account, Decimal("500")))
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("600"))
+        self.assertEqual(loan.disbursement.transaction_type, LOAN)
+        self.assertEqual(loan.disbursement.balance_after_transaction, Decimal("600"))
+        self.assertEqual(bank_reserve_total(), Decimal("600"))
+        with self.assertRaises(PostingError):
+            approve_loan(loan)
+
+    def test_repayment_is_a_separate_ledger_entry(self):
+        loan = approve_loan(request_loan(self.account, Decimal("500")))
+
+        post_loan_payment(loan)
+
+        self.account.refresh_from_db()
+        loan.refresh_from_db()
+        self.assertEqual(loan.status, LOAN_REPAID)
+        self.assertEqual(self.account.balance, Decimal("100"))
+        self.assertEqual(self.account.active_loans, 0)
+        self.assertEqual(
+            list(
+                self.account.transactions.order_by("pk").values_list(
+                    "transaction_type", "balance_after_transaction"
+                )
+            ),
+            [(LOAN, Decimal("600")), (LOAN_PAID, Decimal("100"))],
+        )
+        self.assertEqual(loan.repayment.amount, Decimal("500"))
+        with self.assertRaises(PostingError):
+            post_loan_payment(loan)
+
+    def test_failed_repayment_keeps_loan_approved(self):
+        loan = approve_loan(request_loan(self.account, Decimal("500")))
+        post_withdrawal(self.account, Decimal("550"))
+
+        with self.assertRaises(InsufficientBalance):
+            post_loan_payment(loan)
+
+        loan.refresh_from_db()
+        self.assertEqual(loan.status, LOAN_APPROVED)
+
+    def test_request_view_enforces_limit(self):
+        self.client.force_login(self.account.user)
+        self.account.active_loans = 3
+        self.account.save()
+
+        response = self.client.post(
+            reverse("loan_request"), {"amount": "10", "transaction_type": LOAN}
+        )
+
+        self.assertContains(response, "You have already requested 3 loans.")
+        self.assertFalse(self.account.loans.exists())
+
+    def test_cannot_pay_another_customers_loan(self):
+        other = create_account("other", balance=1000)
+        loan = approve_loan(request_loan(other, Decimal("100")))
+        self.client.force_login(self.account.user)
+
+        response = self.client.get(reverse("loan_pay", args=[loan.pk]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(self.admin)
+        self.account = create_account("customer", balance=100)
+        self.other = create_account("other", balance=100)
+
+    def add_rows(self, account, count):
+        TransactionModel.objects.bulk_create(
+            TransactionModel(
+                account=account,
+                transaction_type=DEPOSIT,
+                amount=1,
+                balance_after_transaction=100,
+            )
+            for _ in range(count)
+        )
+
+    def test_transaction_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse("admin:transactions_transactionmodel_changelist")
+        self.add_rows(self.account, 2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.add_rows(self.other, 40)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+    def test_transaction_search_matches_account_number_exactly(self):
+        self.add_rows(self.account, 2)
+        self.add_rows(self.other, 3)
+        url = reverse("admin:transactions_transactionmodel_changelist")
+
+        response = self.client.get(url, {"q": str(self.other.account_number)})
+        nothing = self.client.get(url, {"q": "customer"})
+
+        self.assertEqual(response.context["cl"].result_count, 3)
+        self.assertEqual(nothing.context["cl"].result_count, 0)
+
+    def test_add_posts_entry_and_edit_leaves_balance_alone(self):
+        url = reverse("admin:transactions_transactionmodel_add")
+        data = {"account": self.account.pk, "transaction_type": WITHDRAW}
+
+        refused = self.client.post(url, {**data, "amount": "150"})
+        self.client.post(url, {**data, "amount": "40"})
+        entry = TransactionModel.objects.get()
+        self.client.post(
+            reverse("admin:transactions_transactionmodel_change", args=[entry.pk]),
+            {},
+        )
+
+        self.assertContains(refused, "Insufficient Balance")
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("60"))
+        self.assertEqual(entry.balance_after_transaction, Decimal("60"))
+
+    def test_approve_action_posts_all_loans_together(self):
+        for account in (self.account, self.account, self.other):
+            request_loan(account, Decimal("50"))
+        rebuild_bank_reserve()
+        url = reverse("admin:transactions_loan_changelist")
+
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post(
+                url,
+                {
+                    "action": "approve_selected",
+                    "_selected_action": list(Loan.objects.values_list("pk", flat=True)),
+                },
+            )
+
+        self.account.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("200"))
+        self.assertEqual(self.other.balance, Decimal("150"))
+        self.assertEqual(bank_reserve_total(), Decimal("350"))
+        self.assertFalse(Loan.objects.filter(status=LOAN_REQUESTED).exists())
+        self.assertEqual(
+            list(
+                self.account.transactions.order_by("pk").values_list(
+                    "balance_after_transaction", flat=True
+                )
+            ),
+            [Decimal("150"), Decimal("200")],
+        )
+        updates = [q for q in captured if q["sql"].startswith('UPDATE "accounts_')]
+        self.assertEqual(len(updates), 1)
+
+    def test_approve_loans_query_count_is_flat(self):
+        def approve(loans_per_account):
+            for account in (self.account, self.other):
+                account.active_loans = 0
+                account.save()
+                for _ in range(loans_per_account):
+                    request_loan(account, Decimal("10"))
+            with CaptureQueriesContext(connection) as captured:
+                approved = approve_loans(Loan.objects.all())
+            return len(approved), len(captured)
+
+        approve(1)  # Creates today's summary rows.
+        few, few_queries = approve(1)
+        many, many_queries = approve(3)
+
+        self.assertEqual((few, many), (2, 6))
+        self.assertEqual(many_queries, few_queries)
+
+
+class ConcurrentPostingTestCase(TransactionTestCase):
+    threads = 8
+    postings = 10
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise SkipTest(
+                "Concurrent writers need a file-backed SQLite test database;"
+                " run with --settings=bank_management_project.settings_test"
+            )
+        super().setUpClass()
+
+    def run_threads(self, target):
+        errors = []
+
+        def run(worker):
+            try:
+                target(worker)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(worker,))
+            for worker in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+class AdminPostingConcurrencyTests(ConcurrentPostingTestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=1000)
+        self.loans = [request_loan(self.account, Decimal("7")) for _ in range(3)]
+        rebuild_bank_reserve()
+
+    def test_admin_postings_race_customer_postings(self):
+        model_admin = TransactionAdmin(TransactionModel, admin.site)
+
+        def work(worker):
+            # Every thread holds its own stale copy of the account.
+            account = UserBankAccount.objects.get(pk=self.account.pk)
+            if worker < len(self.loans):
+                approve_loan(Loan.objects.get(pk=self.loans[worker].pk))
+            for _ in range(self.postings):
+                if worker % 2:
+                    post_withdrawal(account, Decimal("3"))
+                else:
+                    entry = TransactionModel(
+                        account=account, transaction_type=DEPOSIT, amount=5
+                    )
+                    model_admin.save_model(None, entry, None, change=False)
+
+        self.run_threads(work)
+
+        self.account.refresh_from_db()
+        deposits = withdrawals = self.threads // 2 * self.postings
+        expected = 1000 + 5 * deposits - 3 * withdrawals + 7 * len(self.loans)
+        self.assertEqual(self.account.balance, expected)
+        self.assertEqual(bank_reserve_total(), expected)
+
+        # Each entry records the balance its own update produced.
+        balance = Decimal(1000)
+        for (
+            transaction_type,
+            amount,
+            balance_after,
+        ) in self.account.transactions.order_by("pk").values_list(
+            "transaction_type", "amount", "balance_after_transaction"
+        ):
+            balance += -amount if transaction_type == WITHDRAW else amount
+            self.assertEqual(balance_after, balance)
+
+
+class HotAccountConcurrencyTests(ConcurrentPostingTestCase):
+    def setUp(self):
+        self.merchant = set_balance_shards(create_account("merchant", 100), 4)
+        self.customers = [
+            create_account(f"customer{worker}", balance=1000)
+            for worker in range(self.threads)
+        ]
+        rebuild_bank_reserve()
+
+    def test_credits_and_debits_race_compaction(self):
+        def work(worker):
+            customer = self.customers[worker]
+            merchant = UserBankAccount.objects.get(pk=self.merchant.pk)
+            for _ in range(self.postings):
+                post_transfer(customer, merchant, Decimal("10"))
+                if worker == 0:
+                    post_withdrawal(merchant, Decimal("1"))
+                elif worker == 1:
+                    compact_balance_shards()
+
+        self.run_threads(work)
+
+        self.merchant.refresh_from_db()
+        expected = 100 + 10 * self.threads * self.postings - self.postings
+        self.assertEqual(self.merchant.current_balance, expected)
+        self.assertEqual(
+            bank_reserve_total(), 1000 * self.threads + 100 - self.postings
+        )
+
+
+class ReconcileTests(TransactionTestCase):
+    def setUp(self):
+        self.customer = create_account("customer")
+        self.merchant = set_balance_shards(create_account("merchant"), 4)
+        post_deposit(self.customer, Decimal("300.10"))
+        post_withdrawal(self.customer, Decimal("0.55"))
+        post_transfer(self.customer, self.merchant, Decimal("99.99"))
+        TransactionModel.objects.filter(transaction_type=DEPOSIT).update(
+            timeStamp=timezone.now() - timedelta(days=400)
+        )
+        archive_transactions()
+
+    def test_reconciled_ledger(self):
+        result = reconcile()
+
+        self.assertEqual(result.accounts, 2)
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(result.mismatches, [])
+
+    def test_reports_mismatches(self):
+        UserBankAccount.objects.filter(pk=self.customer.pk).update(
+            balance=F("balance") + 1
+        )
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 accounts do not reconcile"):
+            call_command("reconcile", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["mismatched"], 1)
+
+        (mismatch,) = reconcile().mismatches
+        self.assertEqual(
+            mismatch,
+            {
+                "account_id": self.customer.pk,
+                "account_number": self.customer.account_number,
+                "expected": "199.56",
+                "actual": "200.56",
+            },
+        )
+
+    def test_process_pool_matches_single_process(self):
+        UserBankAccount.objects.filter(pk=self.merchant.pk).update(initial_amount=5)
+
+        pooled = reconcile(workers=2)
+
+        self.assertEqual(pooled.rows, 4)
+        self.assertEqual(pooled.mismatches, reconcile().mismatches)
+        self.assertEqual(len(pooled.mismatches), 1)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=0)
+        self.client.login(username="customer", password="pass")
+
+    def deposit(self, amount="500", headers=None, **data):
+        return self.client.post(
+            reverse("deposit"),
+            {"amount": amount, "transaction_type": DEPOSIT, **data},
+            headers=headers,
+        )
+
+    def test_replayed_post_moves_money_once(self):
+        first = self.deposit(idempotency_key="abc")
+
+        with self.assertNumQueries(3):
+            replay = self.deposit(idempotency_key="abc")
+
+        self.assertRedirects(replay, first.url)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("500"))
+        self.assertEqual(TransactionModel.objects.count(), 1)
+
+    def test_key_reused_on_another_form_is_rejected(self):
+        self.deposit(idempotency_key="abc")
+
+        response = self.client.post(
+            reverse("withdraw"),
+            {"amount": "100", "transaction_type": WITHDRAW, "idempotency_key": "abc"},
+        )
+
+        self.assertEqual(response.status_code, 422)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal("500"))
+        self.assertEqual(TransactionModel.objects.count(), 1)
+
+    def test_overlong_key_is_rejected(self):
+        response = self.deposit(headers={"Idempotency-Key": "k" * 256})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TransactionModel.objects.exists())
+
+    def test_header_key(self):
+        self.deposit(headers={"Idempotency-Key": "abc"})
+        self.deposit(headers={"Idempotency-Key": "abc"})
+
+        self.assertEqual(TransactionModel.objects.count(), 1)
+
+    def test_invalid_form_does_not_consume_key(self):
+        self.assertEqual(self.deposit("5", idempotency_key="abc").status_code, 200)
+        self.deposit(idempotency_key="abc")
+
+        self.assertEqual(TransactionModel.objects.count(), 1)
+
+    def test_expired_keys_are_ignored_and_pruned(self):
+        self.deposit(idempotency_key="abc")
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        )
+
+        self.deposit(idempotency_key="abc")
+        self.assertEqual(TransactionModel.objects.count(), 2)
+
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - settings.IDEMPOTENCY_KEY_TTL
+        )
+        out = StringIO()
+        call_command("prune_idempotency_keys", stdout=out)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertIn("Pruned 1 idempotency keys", out.getvalue())
+
+
+class BulkTransferTests(TestCase):
+    def setUp(self):
+        self.sender = create_account("payroll", balance=10000)
+        self.receivers = [create_account(f"employee{i}") for i in range(3)]
+
+    def rows(self, *amounts):
+        return [
+            (line, receiver.account_number, amount)
+            for line, (receiver, amount) in enumerate(
+                zip(self.receivers, amounts), start=1
+            )
+        ]
+
+    def test_posts_rows_and_reports_failures(self):
+        rows = self.rows("100", "200", "300") + [
+            (4, 1, "50"),
+            (5, self.receivers[0].account_number, "-5"),
+            (6, self.sender.account_number, "5"),
+            (7, self.receivers[0].account_number, "25"),
+        ]
+
+        result = post_bulk_transfer(self.sender, rows, chunk_size=2)
+
+        self.assertEqual(result.posted, 4)
+        self.assertEqual(result.total, Decimal("625"))
+        self.assertEqual([f["line"] for f in result.failures], [5, 4, 6])
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal("9375"))
+        self.receivers[0].refresh_from_db()
+        self.assertEqual(self.receivers[0].balance, Decimal("125"))
+        last_credit = TransactionModel.objects.filter(
+            account=self.receivers[0], transaction_type=TRANSFER_RECEIVED
+        ).last()
+        self.assertEqual(last_credit.balance_after_transaction, Decimal("125"))
+        self.assertEqual(
+            summarize_range(self.sender, timezone.localdate(), timezone.localdate()),
+            {TRANSFER_MONEY: {"count": 4, "total": Decimal("625")}},
+        )
+
+    def test_rejects_amounts_the_transfer_form_would(self):
+        result = post_bulk_transfer(
+            self.sender, self.rows("0.005", "10.019", "123456789")
+        )
+
+        self.assertEqual(result.posted, 0)
+        self.assertEqual(
+            [f["reason"] for f in result.failures],
+            [
+                "Ensure that there are no more than 2 decimal places.",
+                "Ensure that there are no more than 2 decimal places.",
+                "Ensure that there are no more than 8 digits before the decimal point.",
+            ],
+        )
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal("10000"))
+
+    def test_rejects_account_numbers_that_are_not_integers(self):
+        number = self.receivers[0].account_number
+        rows = parse_transfer_rows(
+            json.dumps(
+                [
+                    {"account_number": number + 0.9, "amount": "10"},
+                    {"account_number": True, "amount": "10"},
+                    {"account_number": number, "amount": True},
+                    {"account_number": str(number), "amount": 10.5},
+                ]
+            ),
+            "json",
+        )
+
+        result = post_bulk_transfer(self.sender, rows)
+
+        self.assertEqual(result.posted, 1)
+        self.assertEqual([f["line"] for f in result.failures], [1, 2, 3])
+        self.receivers[0].refresh_from_db()
+        self.assertEqual(self.receivers[0].balance, Decimal("10.5"))
+
+    def test_chunk_the_sender_cannot_cover_fails_as_a_whole(self):
+        result = post_bulk_transfer(
+            self.sender, self.rows("4000", "4000", "4000"), chunk_size=2
+        )
+
+        self.assertEqual(result.posted, 2)
+        self.assertEqual([f["line"] for f in result.failures], [3])
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal("2000"))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        receivers = [create_account(f"extra{i}") for i in range(20)]
+        rows = [(i, r.account_number, "1") for i, r in enumerate(receivers)]
+        post_bulk_transfer(self.sender, rows[:1])
+
+        with CaptureQueriesContext(connection) as few:
+            post_bulk_transfer(self.sender, rows[:5])
+        with CaptureQueriesContext(connection) as many:
+            post_bulk_transfer(self.sender, rows)
+
+        self.assertEqual(len(few), len(many))
+
+    def test_endpoint_accepts_json(self):
+        self.client.login(username="payroll", password="pass")
+        payload = [
+            {"account_number": r.account_number, "amount": "10"} for r in self.receivers
+        ]
+
+        response = self.client.post(
+            reverse("bulk_transfer"),
+            json.dumps(payload),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.json()["posted"], 3)
+        self.assertEqual(OutboxEmail.objects.count(), 3)
+
+    def test_command_reads_csv(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / "pay.csv"
+        path.write_text(
+            "account_number,amount\n"
+            + "".join(f"{r.account_number},10\n" for r in self.receivers)
+        )
+
+        out = StringIO()
+        call_command("bulk_transfer", self.sender.account_number, str(path), stdout=out)
+
+        self.assertEqual(json.loads(out.getvalue())["posted"], 3)
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, Decimal("9970"))
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.account = create_account("customer", balance=250)
+        disbursement = TransactionModel.objects.create(
+            account=self.account,
+            transaction_type=LOAN,
+            amount=1000,
+            balance_after_transaction=250,
+        )
+        Loan.objects.create(
+            account=self.account,
+            amount=1000,
+            status=LOAN_APPROVED,
+            disbursement=disbursement,
+        )
+
+    async def test_requires_login(self):
+        response = await self.async_client.get(reverse("all_loans"))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+    async def test_loan_list_and_report(self):
+        await self.async_client.aforce_login(self.account.user)
+
+        loans = await self.async_client.get(reverse("all_loans"))
+        report = await self.async_client.get(reverse("transaction_report"))
+
+        self.assertEqual(len(loans.context["loans"]), 1)
+        self.assertContains(report, "balance : 250")
+        self.assertEqual(len(report.context["object_list"]), 1)
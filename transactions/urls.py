@@ -1,10 +1,13 @@
 from django.urls import path
 
 from .views import (
+    BulkTransferView,
     DepositView,
+    EventStreamView,
     LoanListView,
     LoanRequestView,
     PayLoanView,
+    TransactionExportView,
     TransactionReportView,
     TransferMoneyView,
     WithdrawView,
@@ -13,9 +16,12 @@ from .views import (
 urlpatterns = [
     path("deposit/", DepositView.as_view(), name="deposit"),
     path("report/", TransactionReportView.as_view(), name="transaction_report"),
+    path("report/export/", TransactionExportView.as_view(), name="transaction_export"),
     path("withdraw/", WithdrawView.as_view(), name="withdraw"),
     path("transfer/", TransferMoneyView.as_view(), name="transfer"),
+    path("transfer/bulk/", BulkTransferView.as_view(), name="bulk_transfer"),
     path("loan_request/", LoanRequestView.as_view(), name="loan_request"),
     path("loans/", LoanListView.as_view(), name="all_loans"),
     path("loan/<int:loan_id>", PayLoanView.as_view(), name="loan_pay"),
+    path("events/", EventStreamView.as_view(), name="transaction_events"),
 ]
@@ -1,25 +1,120 @@
-from datetime import datetime
-
+import csv
+import hashlib
+import json
+import uuid
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.mail import EmailMultiAlternatives
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.contrib.auth.mixins import (
+    AccessMixin,
+    LoginRequiredMixin,
+    UserPassesTestMixin,
+)
+from django.contrib.auth.models import User
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
 from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.views import View
-from django.views.generic import CreateView, ListView
+from django.views.generic import CreateView, TemplateView
 
 from accounts.models import UserBankAccount
-
-from .constants import DEPOSIT, LOAN, LOAN_PAID, TRANSFER_MONEY, WITHDRAW
+from accounts.snapshots import aaccount_version
+from core.outbox import enqueue_email
+
+from .archive import combine, ledger_parts
+from .bulk import parse_transfer_rows, post_bulk_transfer
+from .constants import (
+    DEPOSIT,
+    LOAN,
+    LOAN_APPROVED,
+    LOAN_REQUESTED,
+    TRANSACTION_TYPE,
+    TRANSFER_MONEY,
+    WITHDRAW,
+)
+from .events import commit_offset, consumer_offset, read_events
 from .forms import DepositForm, LoanRequestForm, TransferMoneyForm, WithdrawForm
-from .models import TransactionModel
+from .idempotency import (
+    MAX_KEY_LENGTH,
+    claim_key,
+    find_result,
+    get_idempotency_key,
+)
+from .models import Loan, TransactionModel
+from .pagination import KeysetPage, akeyset_paginate
+from .services import (
+    InsufficientBalance,
+    LoanLimitReached,
+    PostingError,
+    bank_reserve_total,
+    post_deposit,
+    post_loan_payment,
+    post_transfer,
+    post_withdrawal,
+    request_loan,
+)
+from .summaries import asummarize_range
 
 # Create your views here.from django.views import generic
 
 
+def parse_date_range(params):
+    """Return ``(start_date, end_date)`` from the query string, or None."""
+    start_date_str = params.get("start_date")
+    end_date_str = params.get("end_date")
+    if not (start_date_str and end_date_str):
+        return None
+    start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    return start_date, end_date
+
+
+def day_range_bounds(start_date, end_date):
+    """Return the aware ``[start, end)`` datetimes covering both dates."""
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end_date = end_date + timedelta(days=1)
+    end = timezone.make_aware(datetime.combine(end_date, time.min))
+    return start, end
+
+
+async def aget_account(user):
+    """Return the user's bank account without blocking the event loop."""
+    # AccountModelBackend loads it alongside the user; only query if not.
+    if User.account.related.is_cached(user):
+        return user.account
+    return await UserBankAccount.objects.aget(user=user)
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """LoginRequiredMixin for views whose handlers are all async."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(
+                request.get_full_path(),
+                self.get_login_url(),
+                self.get_redirect_field_name(),
+            )
+        return await super().dispatch(request, *args, **kwargs)
+
+
 def send_transaction_email(user, amount, subject, template):
     message = render_to_string(
         template,
@@ -28,9 +123,7 @@ def send_transaction_email(user, amount, subject, template):
             "amount": amount,
         },
     )
-    send_email = EmailMultiAlternatives(subject, "", to=[user.email])
-    send_email.attach_alternative(message, "text/html")
-    send_email.send()
+    enqueue_email(subject, user.email, message)
 
 
 class TransactionCreateMixin(LoginRequiredMixin, CreateView):
@@ -46,10 +139,49 @@ class TransactionCreateMixin(LoginRequiredMixin, CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["title"] = self.title
-        context.update({"title": self.title})
+        context.update({"title": self.title, "idempotency_key": uuid.uuid4().hex})
         return context
 
+    def post(self, request, *args, **kwargs):
+        key = get_idempotency_key(request)
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return HttpResponseBadRequest(
+                f"Idempotency key must be at most {MAX_KEY_LENGTH} characters"
+            )
+
+        stored = find_result(request.user, key)
+        if stored:
+            return self.replay(stored)
+
+        try:
+            with transaction.atomic():
+                # Inserting the key first makes a concurrent duplicate wait on
+                # the unique index until this posting commits or rolls back.
+                record = claim_key(request.user, key, request.path)
+                response = super().post(request, *args, **kwargs)
+                if isinstance(response, HttpResponseRedirect):
+                    record.response_location = response.url
+                    record.save(update_fields=["response_location"])
+                else:
+                    # Nothing was posted; let the corrected form reuse the key.
+                    record.delete()
+        except IntegrityError:
+            stored = find_result(request.user, key)
+            if stored is None:
+                raise
+            return self.replay(stored)
+        return response
+
+    def replay(self, stored):
+        # A key reused on another form must not pass for that form's result.
+        if stored.path != self.request.path:
+            return HttpResponse(
+                "Idempotency key was already used for another request", status=422
+            )
+        return HttpResponseRedirect(stored.response_location)
+
 
 class DepositView(TransactionCreateMixin):
     title = "Deposit"
@@ -62,18 +194,17 @@ class DepositView(TransactionCreateMixin):
     def form_valid(self, form):
         account = self.request.user.account
         amount = form.cleaned_data["amount"]
-        account.balance += amount
-        account.save(update_fields=["balance"])
+        with transaction.atomic():
+            self.object = post_deposit(account, amount)
+            send_transaction_email(
+                self.request.user,
+                amount,
+                "Deposite Message",
+                "transactions/deposite_mail.html",
+            )
         messages.success(self.request, f"{amount} Tk Succesfully Deposited")
 
-        send_transaction_email(
-            self.request.user,
-            amount,
-            "Deposite Message",
-            "transactions/deposite_mail.html",
-        )
-
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class TransferMoneyView(TransactionCreateMixin):
@@ -92,33 +223,38 @@ class TransferMoneyView(TransactionCreateMixin):
         sender = self.request.user.account
 
         try:
-            reciver = UserBankAccount.objects.get(account_number=account_number)
-            if sender.balance < amount:
-                messages.error(self.request, "Insufficient Balance")
-                return super().form_invalid(form)
-            reciver.balance += amount
-            sender.balance -= amount
-            reciver.save(update_fields=["balance"])
-            sender.save(update_fields=["balance"])
-            messages.success(self.request, "Send Money Successful")
-            send_transaction_email(
-                self.request.user,
-                amount,
-                "Money Transfer Message",
-                "transactions/deposite_mail.html",
-            )
-            send_transaction_email(
-                reciver.user,
-                amount,
-                "Money Revived Message",
-                "transactions/deposite_mail.html",
+            reciver = UserBankAccount.objects.select_related("user").get(
+                account_number=account_number
             )
-
-            return super().form_valid(form)
         except UserBankAccount.DoesNotExist:
             form.add_error("account_number", "Invalid Account No")
             return super().form_invalid(form)
 
+        try:
+            with transaction.atomic():
+                self.object, _ = post_transfer(sender, reciver, amount)
+                send_transaction_email(
+                    self.request.user,
+                    amount,
+                    "Money Transfer Message",
+                    "transactions/deposite_mail.html",
+                )
+                send_transaction_email(
+                    reciver.user,
+                    amount,
+                    "Money Revived Message",
+                    "transactions/deposite_mail.html",
+                )
+        except InsufficientBalance:
+            messages.error(self.request, "Insufficient Balance")
+            return super().form_invalid(form)
+        except PostingError as e:
+            form.add_error("account_number", str(e))
+            return super().form_invalid(form)
+
+        messages.success(self.request, "Send Money Successful")
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class WithdrawView(TransactionCreateMixin):
     title = "Withdraw"
@@ -131,110 +267,347 @@ class WithdrawView(TransactionCreateMixin):
         account = self.request.user.account
         amount = form.cleaned_data["amount"]
 
-        bank_balance = UserBankAccount.objects.aggregate(total_balance=Sum("balance"))[
-            "total_balance"
-        ]
+        bank_balance = bank_reserve_total()
 
-        if bank_balance == 0 or bank_balance is None or bank_balance < amount:
+        if bank_balance == 0 or bank_balance < amount:
             messages.warning(self.request, "Bank is Bankrupt")
             return self.form_invalid(form)
 
-        account.balance -= amount
-        account.save(update_fields=["balance"])
+        try:
+            self.object = post_withdrawal(account, amount)
+        except InsufficientBalance:
+            form.add_error("amount", "Insufficient balance to withdraw this amount.")
+            return self.form_invalid(form)
         messages.success(self.request, f"{amount} Tk successfully withdrawn")
 
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class LoanRequestView(TransactionCreateMixin):
     title = "Request For Loan"
     form_class = LoanRequestForm
+    # A request is not a ledger entry until the loan is approved.
+    success_url = reverse_lazy("all_loans")
 
     def get_initial(self):
         initial = {"transaction_type": LOAN}
         return initial
 
     def form_valid(self, form):
-        current_loan_count = TransactionModel.objects.filter(
-            account=self.request.user.account,
-            transaction_type=LOAN,
-            loan_approve=True,
-        ).count()
-        if current_loan_count >= 3:
-            return HttpResponse("You have already requested 3 loans.")
-
+        account = self.request.user.account
+        try:
+            self.object = request_loan(account, form.cleaned_data["amount"])
+        except LoanLimitReached as e:
+            return HttpResponse(str(e))
         messages.success(self.request, f"Loan Requested to Administrator Approval")
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
 
-class TransactionReportView(LoginRequiredMixin, ListView):
+class TransactionReportView(AsyncLoginRequiredMixin, TemplateView):
     template_name = "transactions/transaction_report.html"
-    model = TransactionModel
+    body_template_name = "transactions/transaction_report_body.html"
+    rows_template_name = "transactions/transaction_report_rows.html"
     balance = 0
-    context_object_name = "sa"
+    type_totals = None
+    paginate_by = 25
+    stream_chunk_size = 500
+    stream_marker = "<!-- transaction rows -->"
 
-    def get_queryset(self):
-        queryset = super().get_queryset().filter(account=self.request.user.account)
-        start_date_str = self.request.GET.get("start_date")
-        end_date_str = self.request.GET.get("end_date")
+    async def get(self, request, *args, **kwargs):
+        self.account = await aget_account(request.user)
+        try:
+            self.date_range = parse_date_range(request.GET)
+        except ValueError:
+            return HttpResponseBadRequest("Dates must be in YYYY-MM-DD format")
+        if request.GET.get("stream"):
+            return await self.stream_report()
+
+        timeout = settings.REPORT_CACHE_TIMEOUT
+        key = await self.aget_cache_key() if timeout else None
+        body = await cache.aget(key) if key else None
+        if body is None:
+            body = await self.render_body()
+            if key:
+                await cache.aset(key, body, timeout)
+        return self.render_to_response({"view": self, "report_body": mark_safe(body)})
+
+    async def aget_cache_key(self):
+        # Every posting to the account bumps its version once it commits. It
+        # is read before the ledger, so a page rendered while a posting lands
+        # is stored under the old version and never served.
+        version = await aaccount_version(self.account.user_id)
+        query = hashlib.sha256(self.request.GET.urlencode().encode()).hexdigest()
+        return f"transaction-report:{self.account.pk}:{version}:{query}"
+
+    async def render_body(self):
+        if self.date_range:
+            self.type_totals = await asummarize_range(self.account, *self.date_range)
+        self.balance = await self.account.acurrent_balance()
 
-        if start_date_str and end_date_str:
+        try:
+            page = await akeyset_paginate(
+                self.get_ledger(),
+                self.paginate_by,
+                after=self.request.GET.get("after"),
+                before=self.request.GET.get("before"),
+            )
+        except ValueError:
+            raise Http404("Invalid page cursor")
+        return await sync_to_async(render_to_string)(
+            self.body_template_name, self.get_context_data(page=page), self.request
+        )
 
-            start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    def get_ledger(self):
+        # A plain range on timeStamp can seek the (account, timeStamp) index,
+        # unlike a __date lookup which wraps the column. The archive is only
+        # read when the range reaches back past the archive horizon.
+        start = end = None
+        if self.date_range:
+            start, end = day_range_bounds(*self.date_range)
+        return ledger_parts(start, end, account=self.account)
+
+    def get_page_url(self, **cursor):
+        query = self.request.GET.copy()
+        for key in ("after", "before", "stream"):
+            query.pop(key, None)
+        query.update(cursor)
+        return f"?{query.urlencode()}"
+
+    def get_context_data(self, page, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(
+            {
+                "account": self.account,
+                "object_list": page.object_list,
+                "page_obj": page,
+                "is_paginated": page.has_other_pages(),
+            }
+        )
+        if self.type_totals:
+            context["type_totals"] = [
+                (dict(TRANSACTION_TYPE).get(transaction_type), totals)
+                for transaction_type, totals in self.type_totals.items()
+            ]
+        if page.has_next():
+            context["next_page_url"] = self.get_page_url(after=page.next_cursor)
+        if page.has_previous():
+            context["previous_page_url"] = self.get_page_url(
+                before=page.previous_cursor
+            )
+        context["stream_url"] = self.get_page_url(stream=1)
+        return context
 
-            # queryset = queryset.filter(transaction_date__range=(start_date, end_date))
+    async def stream_report(self):
+        queryset = combine(self.get_ledger()).order_by("timeStamp", "id")
+        self.balance = await self.account.acurrent_balance()
+        context = self.get_context_data(page=KeysetPage([]), streaming=True)
+        page = await sync_to_async(render_to_string)(
+            self.template_name, context, self.request
+        )
+        head, tail = page.split(self.stream_marker, 1)
+        # A server only streams iterators of its own kind; it collects the
+        # other kind into a list first, so each handler gets a matching one.
+        if isinstance(self.request, ASGIRequest):
+            rows = self.astream_rows(queryset, head, tail)
+        else:
+            rows = self.stream_rows(queryset, head, tail)
+        return StreamingHttpResponse(rows)
+
+    def stream_rows(self, queryset, head, tail):
+        yield head
+        rows = []
+        for row in queryset.iterator(chunk_size=self.stream_chunk_size):
+            rows.append(row)
+            if len(rows) == self.stream_chunk_size:
+                yield render_to_string(self.rows_template_name, {"transactions": rows})
+                rows = []
+        if rows:
+            yield render_to_string(self.rows_template_name, {"transactions": rows})
+        yield tail
+
+    async def astream_rows(self, queryset, head, tail):
+        yield head
+        rows = []
+        async for row in queryset.aiterator(chunk_size=self.stream_chunk_size):
+            rows.append(row)
+            if len(rows) == self.stream_chunk_size:
+                yield render_to_string(self.rows_template_name, {"transactions": rows})
+                rows = []
+        if rows:
+            yield render_to_string(self.rows_template_name, {"transactions": rows})
+        yield tail
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class TransactionExportView(LoginRequiredMixin, View):
+    chunk_size = 2000
+    fields = [
+        "id",
+        "timeStamp",
+        "transaction_type",
+        "amount",
+        "balance_after_transaction",
+    ]
+    content_types = {
+        "csv": "text/csv",
+        "jsonl": "application/x-ndjson",
+    }
+
+    def get(self, request):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in self.content_types:
+            return HttpResponseBadRequest("Unsupported export format")
+        try:
+            date_range = parse_date_range(request.GET)
+        except ValueError:
+            return HttpResponseBadRequest("Dates must be in YYYY-MM-DD format")
+
+        start = end = None
+        if date_range:
+            start, end = day_range_bounds(*date_range)
+        parts = ledger_parts(start, end, account=request.user.account)
+        rows = (
+            combine([part.values_list(*self.fields) for part in parts])
+            .order_by("timeStamp", "id")
+            .iterator(chunk_size=self.chunk_size)
+        )
 
-            queryset = queryset.filter(
-                timeStamp__date__gte=start_date,
-                timeStamp__date__lte=end_date,
-            )
-            self.balance = (
-                TransactionModel.objects.filter(
-                    timeStamp__date__gte=start_date, timeStamp__date__lte=end_date
-                ).aggregate(Sum("amount"))["amount__sum"]
-                or 0
+        lines = getattr(self, f"{export_format}_lines")(rows)
+        response = StreamingHttpResponse(
+            self.batched(lines), content_type=self.content_types[export_format]
+        )
+        filename = f"statement-{request.user.account.account_number}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def batched(self, lines):
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) == self.chunk_size:
+                yield "".join(batch)
+                batch = []
+        yield "".join(batch)
+
+    def csv_lines(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.fields)
+        type_names = dict(TRANSACTION_TYPE)
+        for pk, timestamp, transaction_type, amount, balance in rows:
+            yield writer.writerow(
+                [
+                    pk,
+                    timestamp.isoformat(),
+                    type_names.get(transaction_type),
+                    amount,
+                    balance,
+                ]
             )
 
-        else:
-            self.balance = self.request.user.account.balance
+    def jsonl_lines(self, rows):
+        type_names = dict(TRANSACTION_TYPE)
+        for pk, timestamp, transaction_type, amount, balance in rows:
+            record = {
+                "id": pk,
+                "timeStamp": timestamp.isoformat(),
+                "transaction_type": type_names.get(transaction_type),
+                "amount": str(amount),
+                "balance_after_transaction": str(balance),
+            }
+            yield json.dumps(record) + "\n"
 
-        return queryset.distinct()
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context.update({"account": self.request.user.account})
-        return context
+class BulkTransferView(LoginRequiredMixin, View):
+    chunk_size = 500
+
+    def post(self, request):
+        data_format = "json" if request.content_type == "application/json" else "csv"
+        try:
+            rows = parse_transfer_rows(request.body.decode(), data_format)
+        except (UnicodeDecodeError, ValueError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        result = post_bulk_transfer(request.user.account, rows, self.chunk_size)
+        return JsonResponse(result.as_dict())
 
 
 class PayLoanView(LoginRequiredMixin, View):
 
     def get(self, request, loan_id):
-        loan = get_object_or_404(TransactionModel, id=loan_id)
-
-        if loan.loan_approve:
-            user_account = loan.account
-            if user_account.balance > loan.amount:
-                user_account.balance -= loan.amount
-                loan.balance_after_transaction = user_account.balance
-                user_account.save()
-                loan.transaction_type = LOAN_PAID
-                loan.save()
-                return redirect("all_loans")
-            else:
-                messages.error(self.request, "Insufficient balance to pay loan.")
-                return redirect("all_loans")
-
-
-class LoanListView(LoginRequiredMixin, ListView):
-    model = TransactionModel
+        # Going through the account's manager scopes the lookup to the
+        # customer's own loans and reuses their account for the posting.
+        loan = get_object_or_404(request.user.account.loans, id=loan_id)
+
+        try:
+            post_loan_payment(loan)
+        except InsufficientBalance:
+            messages.error(self.request, "Insufficient balance to pay loan.")
+        except PostingError as e:
+            messages.error(self.request, str(e))
+        return redirect("all_loans")
+
+
+class LoanListView(AsyncLoginRequiredMixin, TemplateView):
     template_name = "transactions/loan_request.html"
-    context_object_name = "loans"
+    extra_context = {"loan_requested": LOAN_REQUESTED, "loan_approved": LOAN_APPROVED}
 
-    def get_queryset(self):
-        user_account = self.request.user.account
-        queryset = TransactionModel.objects.filter(
-            account=user_account,
-            transaction_type=LOAN,
-        )
-        return queryset
+    async def get(self, request, *args, **kwargs):
+        account = await aget_account(request.user)
+        loans = [loan async for loan in Loan.objects.filter(account=account)]
+        return self.render_to_response(self.get_context_data(loans=loans, **kwargs))
+
+
+class EventStreamView(UserPassesTestMixin, View):
+    """
+    Tail the transaction event stream; staff only.
+
+    GET returns the events after ``after``, or after ``group``'s committed
+    offset, and the cursor to read from next. POST commits ``position`` as
+    ``group``'s offset once the consumer has processed up to it.
+    """
+
+    raise_exception = True
+    default_limit = 1000
+    max_limit = 10000
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        group = request.GET.get("group")
+        try:
+            after = request.GET.get("after")
+            after = int(after) if after is not None else None
+            limit = int(request.GET.get("limit", self.default_limit))
+        except ValueError:
+            return HttpResponseBadRequest("after and limit must be integers")
+        if after is None:
+            if not group:
+                return HttpResponseBadRequest("Pass a cursor or a consumer group")
+            after = consumer_offset(group)
+
+        events = read_events(after, min(max(limit, 1), self.max_limit))
+        next_cursor = events[-1]["sequence"] if events else after
+        return JsonResponse({"events": events, "next": next_cursor})
+
+    def post(self, request):
+        if request.content_type == "application/json":
+            try:
+                data = json.loads(request.body)
+            except ValueError:
+                return HttpResponseBadRequest("Invalid JSON")
+        else:
+            data = request.POST
+        group = data.get("group")
+        try:
+            position = int(data.get("position"))
+        except (TypeError, ValueError):
+            return HttpResponseBadRequest("position must be an integer")
+        if not group:
+            return HttpResponseBadRequest("group is required")
+        commit_offset(group, position)
+        return JsonResponse({"group": group, "position": consumer_offset(group)})